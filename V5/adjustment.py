@@ -0,0 +1,244 @@
+"""
+adjustment.py
+"""
+import numpy as np
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import json
+import os
+from data_provider import provider
+from daily_panel import _DailyPanel
+
+"""
+_adjusted_memory: keep_in_memory=True로 변환한 panel {계수 key: (원본 _DailyPanel, 수정주가 _DailyPanel, _AdjustmentFactors)}
+* 원본 panel 객체가 같은 경우에만 사용 (daily panel도 keep_in_memory로 유지되는 경우)
+"""
+_adjusted_memory = {}
+
+
+class _AdjustmentFactors:
+    """
+    종목별 수정주가 계수 table
+    {종목 코드: [[권리락 일자, 계수], ...]}
+    * 수정 가격 = 무수정 가격 x (해당 일자 이후 권리락 계수의 곱)
+    * e.g. 50:1 액면분할 -> 계수 0.02
+    """
+    def __init__(self, factor_dict):
+        self.factor_dict = factor_dict
+        self.ex_dates = {}
+        self.suffix_products = {}
+        for code, events in factor_dict.items():
+            events = sorted(events)
+            self.ex_dates[code] = [event[0] for event in events]
+            # suffix_products[i]: i번째 이후 권리락 계수의 곱
+            products = [1.0]
+            for event in reversed(events):
+                products.append(products[-1] * event[1])
+            self.suffix_products[code] = products[::-1]
+
+    @classmethod
+    def load(cls, fname):
+        with open(fname, 'r') as f:
+            return cls(json.load(f))
+
+    def save(self, fname):
+        with open(fname, 'w') as f:
+            json.dump(self.factor_dict, f)
+
+    def get_factor(self, code, date):
+        """
+        :param code: 종목 코드
+        :param date: 일자
+        :return:
+        해당 일자 무수정 가격 -> 수정 가격 계수
+        """
+        if code not in self.ex_dates:
+            return 1.0
+        return self.suffix_products[code][bisect_right(self.ex_dates[code], date)]
+
+    def adjust_minute_row(self, code, date, price, volume):
+        """
+        :param code: 종목 코드
+        :param date: 일자
+        :param price: 분 가격 array (무수정)
+        :param volume: 분 거래량 array (무수정)
+        :return:
+        수정 가격 array, 수정 거래량 array
+        """
+        factor = self.get_factor(code, date)
+        if factor == 1.0:
+            return price, volume
+        return price * factor, np.round(volume / factor).astype(np.int64)
+
+    def adjust_daily_panel(self, daily_panel):
+        """
+        :param daily_panel: _DailyPanel (무수정)
+        :return:
+        수정 가격 기준 _DailyPanel (원본 daily_panel은 변경하지 않음)
+        """
+        data = daily_panel.data.copy()
+        price_columns = [daily_panel.column_idx[column] for column in ['시가', '고가', '저가', '종가']]
+        volume_column = daily_panel.column_idx['거래량']
+        for code in self.factor_dict:
+            if code not in daily_panel.code_idx:
+                continue
+            c = daily_panel.code_idx[code]
+            factors = np.array([self.get_factor(code, date) for date in daily_panel.dates])
+            for column in price_columns:
+                data[:, c, column] *= factors
+            data[:, c, volume_column] /= factors
+        return _DailyPanel(daily_panel.dates, daily_panel.codes, data)
+
+
+def _get_adjustment_ratio(code, start_date, end_date):
+    """
+    :return:
+    {일자: 수정 종가 / 무수정 종가} (해당 일자 무수정 -> 조회 시점 기준 수정 가격 계수)
+    """
+    adjusted = provider.get_market_ohlcv_by_date(start_date, end_date, code)
+    unadjusted = provider.get_market_ohlcv_by_date(start_date, end_date, code, adjusted=False)
+    if len(adjusted) == 0 or len(unadjusted) == 0:
+        return {}
+    ratio = (adjusted['종가'] / unadjusted['종가']).replace([np.inf, -np.inf], np.nan).dropna()
+    return {datetime.strftime(date, "%Y%m%d"): float(value) for date, value in ratio.items()}
+
+
+def _get_events(ratio, tolerance=1e-3):
+    """
+    :param ratio: _get_adjustment_ratio 결과
+    :param tolerance: 계수 변화 인식 기준
+    :return:
+    [[권리락 일자, 계수], ...]
+    * 비율이 바뀌는 일자를 권리락 일자로 간주
+    * 마지막 일자 이후 권리락(비율이 1이 아닌 채로 종료)은 마지막 일자 다음 날 권리락으로 기록
+    -> 조회 시점 기준 수정 가격(수정 분 단위 데이터와 동일 기준)으로 변환
+    """
+    dates = sorted(ratio)
+    events = []
+    for i in range(1, len(dates)):
+        factor = ratio[dates[i - 1]] / ratio[dates[i]]
+        if abs(factor - 1) > tolerance:
+            events.append([dates[i], factor])
+    if dates and abs(ratio[dates[-1]] - 1) > tolerance:
+        next_date = datetime.strftime(datetime.strptime(dates[-1], "%Y%m%d") + timedelta(days=1), "%Y%m%d")
+        events.append([next_date, ratio[dates[-1]]])
+    return events
+
+
+def build_adjustment_factors(code_list, start_date, end_date, tolerance=1e-3):
+    """
+    :param code_list: 종목 코드 리스트
+    :param start_date: 시작 일자
+    :param end_date: 종료 일자
+    :param tolerance: 계수 변화 인식 기준
+    :return:
+    _AdjustmentFactors
+    * pykrx 수정/무수정 종가 비율 기준 (_get_events)
+    """
+    factor_dict = {}
+    for code in code_list:
+        events = _get_events(_get_adjustment_ratio(code, start_date, end_date), tolerance)
+        if events:
+            factor_dict[code] = events
+    return _AdjustmentFactors(factor_dict)
+
+
+def load_adjustment_factors(code_list, start_date, end_date, cache_dir='./cache/', tolerance=1e-3):
+    """
+    :param code_list: 종목 코드 리스트 (e.g. 기간 내 거래량 상위 종목)
+    :param start_date: 시작 일자
+    :param end_date: 종료 일자
+    :param cache_dir: 캐시 저장 경로
+    :param tolerance: 계수 변화 인식 기준
+    :return:
+    _AdjustmentFactors
+    * 수정 분 단위 데이터 사용 시 daily panel(무수정 스냅샷)을 같은 기준으로 맞추기 위해 사용
+    * 종목별 비율을 cache_dir/adjustment_ratios.json에 누적 저장 (시장 데이터 source별 경로)
+    {종목 코드: {'구간': [조회 시작 일자, 조회 종료 일자], '비율': {일자: 비율}}}
+    * 새 종목 및 저장된 구간 밖 일자만 조회 (구간 경계 일자 포함)
+    -> 경계 일자 비율이 다른 경우(조회 이후 새 권리락으로 기준 변경) 해당 종목 전체 구간 다시 조회
+    """
+    cache_dir = provider.get_derived_cache_dir(cache_dir)
+    fname = os.path.join(cache_dir, 'adjustment_ratios.json')
+    ratio_store = {}
+    if os.path.isfile(fname):
+        with open(fname, 'r') as f:
+            ratio_store = json.load(f)
+
+    updated = False
+    for code in code_list:
+        if code not in ratio_store:
+            ratio_store[code] = {'구간': [start_date, end_date],
+                                 '비율': _get_adjustment_ratio(code, start_date, end_date)}
+            updated = True
+            continue
+        fetch_start, fetch_end = ratio_store[code]['구간']
+        if start_date >= fetch_start and end_date <= fetch_end:
+            continue
+        ratio = ratio_store[code]['비율']
+        new_ratio = {}
+        if start_date < fetch_start:
+            new_ratio.update(_get_adjustment_ratio(code, start_date, fetch_start))
+        if end_date > fetch_end:
+            new_ratio.update(_get_adjustment_ratio(code, fetch_end, end_date))
+        fetch_start, fetch_end = min(start_date, fetch_start), max(end_date, fetch_end)
+        if any(abs(new_ratio[date] / ratio[date] - 1) > tolerance for date in new_ratio if date in ratio):
+            ratio = _get_adjustment_ratio(code, fetch_start, fetch_end)
+        else:
+            ratio = {**ratio, **new_ratio}
+        ratio_store[code] = {'구간': [fetch_start, fetch_end], '비율': ratio}
+        updated = True
+
+    if updated:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(fname, 'w') as f:
+            json.dump(ratio_store, f)
+
+    factor_dict = {}
+    for code in code_list:
+        events = _get_events(ratio_store[code]['비율'], tolerance)
+        if events:
+            factor_dict[code] = events
+    return _AdjustmentFactors(factor_dict)
+
+
+def load_adjusted_panel(daily_panel, code_list=None, start_date=None, end_date=None, adjustment_factor_file=None,
+                        cache_dir='./cache/', keep_in_memory=False):
+    """
+    :param daily_panel: _DailyPanel (무수정)
+    :param code_list: 계수 산출 종목 코드 리스트 (adjustment_factor_file 미 지정 시)
+    :param start_date: 시작 일자 (adjustment_factor_file 미 지정 시)
+    :param end_date: 종료 일자 (adjustment_factor_file 미 지정 시)
+    :param adjustment_factor_file: 무수정 분 단위 데이터용 계수 파일 (지정 시 code_list / 기간 무시)
+    :param cache_dir: 캐시 저장 경로
+    :param keep_in_memory: True인 경우 process memory에 유지 (동일 panel / 계수 재 실행 시 계수 로드 및 변환 생략)
+    :return:
+    수정 가격 기준 _DailyPanel, _AdjustmentFactors
+    """
+    if adjustment_factor_file is not None:
+        key = (os.path.abspath(adjustment_factor_file), os.path.getmtime(adjustment_factor_file))
+    else:
+        key = (tuple(code_list), start_date, end_date)
+    if keep_in_memory and key in _adjusted_memory and _adjusted_memory[key][0] is daily_panel:
+        return _adjusted_memory[key][1:]
+
+    if adjustment_factor_file is not None:
+        adjustment_factors = _AdjustmentFactors.load(adjustment_factor_file)
+    else:
+        adjustment_factors = load_adjustment_factors(code_list, start_date, end_date, cache_dir=cache_dir)
+    adjusted_panel = adjustment_factors.adjust_daily_panel(daily_panel)
+    if keep_in_memory:
+        _adjusted_memory[key] = (daily_panel, adjusted_panel, adjustment_factors)
+    return adjusted_panel, adjustment_factors
+
+
+if __name__ == '__main__':
+    """
+    Usage: python adjustment.py <start_date> <end_date> <factor_file>
+    * krx_codes.json 종목 대상
+    """
+    import sys
+    with open('krx_codes.json', 'r') as f:
+        code_list = json.load(f)
+    build_adjustment_factors(code_list, sys.argv[1], sys.argv[2]).save(sys.argv[3])
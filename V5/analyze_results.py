@@ -6,12 +6,11 @@ import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 import math
 import matplotlib.dates as mdates
-import FinanceDataReader as fdr
 import scipy.stats as stats
 import pandas as pd
 import dataframe_image as dfi
 import os
-from pykrx import stock
+from data_provider import provider
 
 def _get_duration_num_transactions(yield_list, num_bought_list, num_sold_list):
     """
@@ -177,7 +176,8 @@ def _get_kospi_kosdaq_correlation(yield_list, save_dir):
     # KOSPI
     kospi_yield_list = []
     start_date = datetime.strftime(date_list[0], "%Y-%m-%d")
-    kospi_df = fdr.DataReader('KS11', start_date)
+    end_date = datetime.strftime(date_list[-1], "%Y-%m-%d")
+    kospi_df = provider.data_reader('KS11', start_date, end_date)
     for date in date_list:
         s_date = datetime.strftime(date, "%Y%m%d")
         kospi_yield_list.append([s_date, kospi_df.loc[date]['Change']]*100)
@@ -186,7 +186,8 @@ def _get_kospi_kosdaq_correlation(yield_list, save_dir):
     # KOSDAQ
     kosdaq_yield_list = []
     start_date = datetime.strftime(date_list[0], "%Y-%m-%d")
-    kosdaq_df = fdr.DataReader('KQ11', start_date)
+    end_date = datetime.strftime(date_list[-1], "%Y-%m-%d")
+    kosdaq_df = provider.data_reader('KQ11', start_date, end_date)
     for date in date_list:
         s_date = datetime.strftime(date, "%Y%m%d")
         kosdaq_yield_list.append([s_date, kosdaq_df.loc[date]['Change']]*100)
@@ -259,7 +260,8 @@ def _get_yield_plots(yield_list, save_dir):
     # KOSPI
     kospi_index_list = []
     start_date = datetime.strftime(date_list[0], "%Y-%m-%d")
-    kospi_df = fdr.DataReader('KS11', start_date)
+    end_date = datetime.strftime(date_list[-1], "%Y-%m-%d")
+    kospi_df = provider.data_reader('KS11', start_date, end_date)
     for date in date_list:
         s_date = datetime.strftime(date, "%Y%m%d")
         kospi_index_list.append([s_date, kospi_df.loc[date]['Close']])
@@ -271,7 +273,8 @@ def _get_yield_plots(yield_list, save_dir):
     # KOSDAQ
     kosdaq_index_list = []
     start_date = datetime.strftime(date_list[0], "%Y-%m-%d")
-    kosdaq_df = fdr.DataReader('KQ11', start_date)
+    end_date = datetime.strftime(date_list[-1], "%Y-%m-%d")
+    kosdaq_df = provider.data_reader('KQ11', start_date, end_date)
     for date in date_list:
         s_date = datetime.strftime(date, "%Y%m%d")
         kosdaq_index_list.append([s_date, kosdaq_df.loc[date]['Close']])
@@ -417,8 +420,9 @@ def _get_monthly_yield(yield_list, sold_stock_list, save_dir):
 
     # Load Index Data
     start_date = datetime.strftime(date_list[0], "%Y-%m-%d")
-    kospi_df = fdr.DataReader('KS11', start_date)
-    kosdaq_df = fdr.DataReader('KQ11', start_date)
+    end_date = datetime.strftime(date_list[-1], "%Y-%m-%d")
+    kospi_df = provider.data_reader('KS11', start_date, end_date)
+    kosdaq_df = provider.data_reader('KQ11', start_date, end_date)
 
     st = datetime.strftime(date_list[0], "%y%m")
     ed = datetime.strftime(date_list[-1], "%y%m")
@@ -529,7 +533,7 @@ def _get_individual_yield(all_sold_stock_list, save_dir, reference='수익률',
     for i in range(len(all_sold_stock_list)):
         for sold_stock in all_sold_stock_list[i]:
             code = sold_stock['코드']
-            name = stock.get_market_ticker_name(code)
+            name = provider.get_market_ticker_name(code)
             b_price = sold_stock['매입가']
             s_price = sold_stock['매도가']
             quantity = sold_stock['수량']
@@ -578,7 +582,7 @@ def _save_balance(date, day_stock_list, day_sold_stock_list, is_stock, save_dir)
     num_days_list = []
     for date_stock in day_stock_list:
         code = date_stock['코드']
-        name = stock.get_market_ticker_name(code) if is_stock else stock.get_etf_ticker_name(code)
+        name = provider.get_market_ticker_name(code) if is_stock else provider.get_etf_ticker_name(code)
         price = date_stock['매입가']
         quantity = date_stock['수량']
         current_price = date_stock['현재가']
@@ -607,7 +611,7 @@ def _save_balance(date, day_stock_list, day_sold_stock_list, is_stock, save_dir)
     num_days_list = []
     for date_sold_stock in day_sold_stock_list:
         code = date_sold_stock['코드']
-        name = stock.get_market_ticker_name(code) if is_stock else stock.get_etf_ticker_name(code)
+        name = provider.get_market_ticker_name(code) if is_stock else provider.get_etf_ticker_name(code)
         _yield = date_sold_stock['수익률']
         profit = date_sold_stock['손익']
         num_days = date_sold_stock['보유일수']
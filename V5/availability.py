@@ -0,0 +1,107 @@
+"""
+availability.py
+"""
+import hashlib
+import json
+import os
+
+"""
+_index_memory: keep_in_memory=True로 load한 index {index 파일명: _AvailabilityIndex}
+"""
+_index_memory = {}
+
+
+class _AvailabilityIndex:
+    """
+    분 단위 데이터 보유 현황 index
+    {종목 코드: set(보유 일자)}
+    * 종목 폴더(A{code})의 mtime이 바뀐 경우에만 해당 폴더를 다시 읽음 (incremental refresh)
+    """
+    def __init__(self, data_dir, index_file=None):
+        self.data_dir = data_dir
+        self.index_file = index_file
+        self.code_dates = {}
+        self.code_mtimes = {}
+        if index_file is not None and os.path.isfile(index_file):
+            with open(index_file, 'r') as f:
+                index = json.load(f)
+            for code, item in index['codes'].items():
+                self.code_dates[code] = set(item['dates'])
+                self.code_mtimes[code] = item['mtime']
+
+    def refresh(self):
+        """
+        :return:
+        변경된 종목 코드 리스트
+        """
+        changed_code_list = []
+        existing_code_set = set()
+        for entry in os.scandir(self.data_dir):
+            if not entry.is_dir():
+                continue
+            code = entry.name[1:]
+            existing_code_set.add(code)
+            mtime = entry.stat().st_mtime
+            if self.code_mtimes.get(code) == mtime:
+                continue
+            self.code_dates[code] = set(file_name[:-5] for file_name in os.listdir(entry.path)
+                                        if file_name.endswith('.json'))
+            self.code_mtimes[code] = mtime
+            changed_code_list.append(code)
+        # 삭제된 종목
+        for code in list(self.code_dates):
+            if code not in existing_code_set:
+                del self.code_dates[code]
+                del self.code_mtimes[code]
+                changed_code_list.append(code)
+        return changed_code_list
+
+    def save(self):
+        if self.index_file is None:
+            return
+        index_dir = os.path.dirname(self.index_file)
+        if index_dir and not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        index = {
+            'data_dir': self.data_dir,
+            'codes': {code: {'mtime': self.code_mtimes[code], 'dates': sorted(dates)}
+                      for code, dates in self.code_dates.items()},
+        }
+        with open(self.index_file, 'w') as f:
+            json.dump(index, f)
+
+    def has(self, code, date):
+        """
+        :return:
+        해당 종목의 해당 일자 분 단위 데이터 보유 여부
+        """
+        dates = self.code_dates.get(code)
+        return dates is not None and date in dates
+
+    def get_code_set(self):
+        """
+        :return:
+        분 단위 데이터 보유 종목 코드 set
+        """
+        return set(self.code_dates)
+
+
+def load_availability_index(data_dir, cache_dir='./cache/', keep_in_memory=False):
+    """
+    :param data_dir: 분 단위 데이터 경로 (e.g. 'C:/Git/Data/수정/minute_Data/')
+    :param cache_dir: index 저장 경로
+    :param keep_in_memory: True인 경우 process memory에 유지 (재 호출 시 파일 로드 없이 변경분만 갱신)
+    :return:
+    _AvailabilityIndex (저장된 index를 불러온 뒤 변경분만 갱신)
+    """
+    key = hashlib.md5(os.path.abspath(data_dir).encode('utf-8')).hexdigest()
+    index_file = os.path.join(cache_dir, 'availability_' + key + '.json')
+    if keep_in_memory and index_file in _index_memory:
+        availability = _index_memory[index_file]
+    else:
+        availability = _AvailabilityIndex(data_dir, index_file)
+    if availability.refresh():
+        availability.save()
+    if keep_in_memory:
+        _index_memory[index_file] = availability
+    return availability
@@ -0,0 +1,109 @@
+"""
+backtest_server.py
+"""
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib import request
+import json
+import threading
+import time
+import simulation
+
+"""
+DEFAULT_PARAMS: job에 없는 parameter는 simulation.py의 test_params + transaction_params 사용
+* keep_in_memory: 시장 데이터, daily panel(수정주가 변환 포함), factor store, availability index를 server process에 유지
+* save_outputs: 결과 이미지(balance, graphs) 저장 생략 (job에서 True로 지정 가능)
+"""
+DEFAULT_PARAMS = simulation.all_params.copy()
+DEFAULT_PARAMS.update({'keep_in_memory': True, 'save_outputs': False})
+
+
+def _to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(type(value).__name__)
+
+
+class _BacktestHandler(BaseHTTPRequestHandler):
+    """
+    GET /status: server 상태 (job 실행 중에도 응답)
+    POST /backtest: body = {parameter: 값, ...} (test_params / transaction_params 형식)
+    """
+    server_lock = threading.Lock()
+    start_time = time.time()
+    num_jobs = 0
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, default=_to_builtin, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != '/status':
+            self._send_json(404, {'error': 'unknown path: ' + self.path})
+            return
+        self._send_json(200, {'uptime': round(time.time() - self.start_time, 2), 'num_jobs': self.num_jobs})
+
+    def do_POST(self):
+        if self.path != '/backtest':
+            self._send_json(404, {'error': 'unknown path: ' + self.path})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            job_params = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError as e:
+            self._send_json(400, {'error': 'invalid json: ' + str(e)})
+            return
+
+        all_params = DEFAULT_PARAMS.copy()
+        all_params.update(job_params)
+        # provider 및 메모리 캐시 공유 -> 한 번에 하나의 job만 실행
+        with self.server_lock:
+            start_time = time.time()
+            try:
+                result_params = simulation.simulation(**all_params)
+            except Exception as e:
+                self._send_json(500, {'error': type(e).__name__ + ': ' + str(e)})
+                return
+            _BacktestHandler.num_jobs += 1
+        self._send_json(200, {'elapsed': round(time.time() - start_time, 2), 'result': result_params})
+
+
+def run_server(host='127.0.0.1', port=8765):
+    """
+    :param host: server 주소 (기본: local only)
+    :param port: server port
+    :return:
+    """
+    server = ThreadingHTTPServer((host, port), _BacktestHandler)
+    server.daemon_threads = True
+    print('Backtest server: http://' + host + ':' + str(port) + '/backtest')
+    server.serve_forever()
+
+
+def request_backtest(params, host='127.0.0.1', port=8765):
+    """
+    :param params: job parameter (e.g. {'start_date': '20210701', '목표가': '3%'})
+    :param host: server 주소
+    :param port: server port
+    :return:
+    {'elapsed': 소요 시간, 'result': result_params}
+    """
+    data = json.dumps(params, ensure_ascii=False).encode('utf-8')
+    req = request.Request('http://' + host + ':' + str(port) + '/backtest', data=data,
+                          headers={'Content-Type': 'application/json; charset=utf-8'})
+    with request.urlopen(req) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+if __name__ == '__main__':
+    """
+    Usage: python backtest_server.py [port]
+    """
+    import sys
+    run_server(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
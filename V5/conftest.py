@@ -0,0 +1,53 @@
+"""
+conftest.py
+"""
+import os
+import pytest
+from data_provider import provider
+from daily_panel import load_daily_panel
+from synthetic_market import generate_synthetic_market, _SyntheticMarket
+
+
+@pytest.fixture(scope='session')
+def synthetic_market_dir(tmp_path_factory):
+    """
+    :return:
+    테스트용 소규모 합성 시장 데이터 경로 (market_dir/stock/, market_dir/ETF/, market_dir/daily.npz)
+    """
+    market_dir = str(tmp_path_factory.mktemp('synthetic')) + '/'
+    generate_synthetic_market(market_dir, '20210401', '20210630', num_KOSPI=30, num_KOSDAQ=30, num_ETF=10, seed=0)
+    return market_dir
+
+
+@pytest.fixture(scope='session')
+def synthetic_panel(synthetic_market_dir, tmp_path_factory):
+    """
+    :return:
+    합성 시장 데이터 전체 기간 _DailyPanel (KOSPI + KOSDAQ)
+    """
+    cache_dir = str(tmp_path_factory.mktemp('cache')) + '/'
+    provider.configure(cache_dir=cache_dir, replay_only=False, source=_SyntheticMarket.load(synthetic_market_dir))
+    return load_daily_panel('20210401', '20210630', cache_dir=cache_dir)
+
+
+@pytest.fixture
+def synthetic_params(synthetic_market_dir, tmp_path, monkeypatch):
+    """
+    :return:
+    합성 시장 데이터 기준 simulation all_params (결과 이미지 미 저장, 캐시 / 종목 리스트는 tmp_path에 저장)
+    """
+    import simulation
+    monkeypatch.chdir(tmp_path)
+    params = simulation.all_params.copy()
+    params.update({
+        'stock_data_dir': os.path.join(synthetic_market_dir, 'stock') + '/',
+        'ETF_data_dir': os.path.join(synthetic_market_dir, 'ETF') + '/',
+        'synthetic_market_dir': synthetic_market_dir,
+        'start_date': '20210601',
+        'end_date': '20210630',
+        'max_stock_num': 5,
+        'cache_dir': str(tmp_path / 'cache') + '/',
+        'prefetch': False,
+        'save_outputs': False,
+    })
+    return params
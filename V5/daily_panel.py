@@ -0,0 +1,130 @@
+"""
+daily_panel.py
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime
+import os
+from data_provider import provider
+
+"""
+_panel_memory: keep_in_memory=True로 load한 panel {캐시 파일명: _DailyPanel}
+"""
+_panel_memory = {}
+
+
+class _DailyPanel:
+    """
+    일 단위 시장 데이터 (일자 x 종목 x OHLCV)
+    * 시장 전체 스냅샷(get_market_ohlcv_by_ticker)을 일자별로 한 번씩만 읽어 구성
+    * 미 상장 등으로 데이터가 없는 경우 NaN
+    """
+    COLUMNS = ['시가', '고가', '저가', '종가', '거래량']
+
+    def __init__(self, dates, codes, data):
+        """
+        :param dates: 거래일 리스트 (e.g. ['20210701', '20210702', ...])
+        :param codes: 종목 코드 리스트 (e.g. ['005930', '000660', ...])
+        :param data: np.ndarray (len(dates), len(codes), len(COLUMNS))
+        """
+        self.dates = list(dates)
+        self.codes = list(codes)
+        self.data = data
+        self.date_idx = {date: i for i, date in enumerate(self.dates)}
+        self.code_idx = {code: i for i, code in enumerate(self.codes)}
+        self.column_idx = {column: i for i, column in enumerate(self.COLUMNS)}
+        self._suspension_bitmap = None
+
+    def has(self, code, date):
+        return code in self.code_idx and date in self.date_idx
+
+    def get_value(self, code, date, column, offset=0):
+        """
+        :param code: 종목 코드
+        :param date: 기준 일자
+        :param column: '시가', '고가', '저가', '종가', '거래량'
+        :param offset: 기준 일자 대비 거래일 offset (e.g. -1: 전 거래일)
+        :return:
+        해당 값 (데이터가 없는 경우 NaN)
+        """
+        d = self.date_idx[date] + offset
+        if code not in self.code_idx or d < 0:
+            return np.nan
+        return self.data[d, self.code_idx[code], self.column_idx[column]]
+
+    def get_suspension_bitmap(self):
+        """
+        :return:
+        np.ndarray (len(dates), len(codes)) bool: 거래 정지(시가 0) 또는 데이터 없음(NaN)
+        * 최초 호출 시 한 번만 계산
+        """
+        if self._suspension_bitmap is None:
+            self._suspension_bitmap = ~(self.data[:, :, self.column_idx['시가']] > 0)
+        return self._suspension_bitmap
+
+    def save(self, fname):
+        np.savez(fname, dates=np.array(self.dates), codes=np.array(self.codes), data=self.data)
+
+    @classmethod
+    def load(cls, fname):
+        npz = np.load(fname)
+        return cls(npz['dates'].tolist(), npz['codes'].tolist(), npz['data'])
+
+
+def _get_market_snapshot(date, markets):
+    """
+    :param date: 일자
+    :param markets: ['KOSPI', 'KOSDAQ', 'ETF']
+    :return:
+    해당 일자 시장 전체 OHLCV df
+    """
+    df_list = []
+    for market in markets:
+        if market == 'ETF':
+            df = provider.get_etf_ohlcv_by_ticker(date)
+        else:
+            df = provider.get_market_ohlcv_by_ticker(date, market=market)
+        df_list.append(df[_DailyPanel.COLUMNS])
+    all_df = pd.concat(df_list)
+    return all_df[~all_df.index.duplicated(keep='first')]
+
+
+def load_daily_panel(start_date, end_date, markets=('KOSPI', 'KOSDAQ'), cache_dir='./cache/', keep_in_memory=False):
+    """
+    :param start_date: 시작 일자 (지표 계산용 과거 구간 포함, e.g. '20210610')
+    :param end_date: 종료 일자 (e.g. '20210731')
+    :param markets: 시장 리스트 (e.g. ['KOSPI', 'KOSDAQ', 'ETF'])
+    :param cache_dir: 캐시 저장 경로
+    :param keep_in_memory: True인 경우 process memory에 유지 (동일 process 재 실행 시 파일 로드 생략)
+    :return:
+    _DailyPanel
+    * 동일 기간 재 실행 시 npz 캐시에서 로드 (시장 데이터 source별 경로)
+    """
+    cache_dir = provider.get_derived_cache_dir(cache_dir)
+    fname = os.path.join(cache_dir, 'daily_panel_' + start_date + '_' + end_date + '_' + '-'.join(markets) + '.npz')
+    if keep_in_memory and fname in _panel_memory:
+        return _panel_memory[fname]
+    if os.path.isfile(fname):
+        panel = _DailyPanel.load(fname)
+        if keep_in_memory:
+            _panel_memory[fname] = panel
+        return panel
+
+    dates_df = provider.get_index_ohlcv_by_date(start_date, end_date, "1001")
+    dates = [datetime.strftime(date, "%Y%m%d") for date in dates_df.index]
+    snapshots = [_get_market_snapshot(date, markets) for date in dates]
+
+    codes = sorted(set().union(*[snapshot.index for snapshot in snapshots]))
+    code_idx = {code: i for i, code in enumerate(codes)}
+    data = np.full((len(dates), len(codes), len(_DailyPanel.COLUMNS)), np.nan)
+    for d, snapshot in enumerate(snapshots):
+        rows = [code_idx[code] for code in snapshot.index]
+        data[d, rows, :] = snapshot.to_numpy(dtype=np.float64)
+
+    panel = _DailyPanel(dates, codes, data)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    panel.save(fname)
+    if keep_in_memory:
+        _panel_memory[fname] = panel
+    return panel
@@ -0,0 +1,233 @@
+"""
+data_provider.py
+"""
+from pykrx import stock
+import FinanceDataReader as fdr
+import pandas as pd
+import copy
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+"""
+_MISSING: 캐시 미스 표시 (캐시된 None과 구분)
+"""
+_MISSING = object()
+
+
+class CacheMissError(LookupError):
+    """
+    replay_only 모드에서 캐시에 없는 데이터를 요청한 경우
+    """
+    pass
+
+
+def _is_empty(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, list, tuple, dict)):
+        return len(value) == 0
+    return False
+
+
+class _DataProvider:
+    """
+    pykrx / FinanceDataReader 호출을 대신하는 시장 데이터 제공자
+    * 모든 호출 결과는 (함수명 + 인자)를 key로 SQLite 캐시에 저장 (빈 결과는 저장하지 않음)
+    * 동일 호출은 네트워크 없이 캐시에서 반환
+    * replay_only=True인 경우 네트워크 호출 없이 캐시만 사용 (캐시에 없으면 CacheMissError)
+    * source 지정 시 pykrx / FinanceDataReader 대신 동일 함수를 제공하는 객체 사용 (e.g. _SyntheticMarket)
+    """
+    def __init__(self, cache_dir='./cache/', replay_only=False, max_retry=10, retry_interval=1):
+        self.cache_dir = cache_dir
+        self.replay_only = replay_only
+        self.max_retry = max_retry
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self.stock_source = stock
+        self.fdr_source = fdr
+        self.source_name = None
+        self.memory_cache = None
+
+    def configure(self, cache_dir=None, replay_only=None, source=None, memory_cache=None):
+        """
+        :param cache_dir: 캐시 저장 경로 (e.g. './cache/')
+        :param replay_only: True(캐시만 사용), False(캐시 미스 시 네트워크 호출)
+        :param source: pykrx.stock 함수 및 DataReader를 제공하는 객체 (None: pykrx / FinanceDataReader)
+        * source는 매 호출마다 지정한 값으로 설정 (이전 실행의 source가 남지 않도록 None도 반영)
+        * source의 호출 결과는 source.name으로 구분하여 캐시 (pykrx 캐시와 섞이지 않음)
+        :param memory_cache: True(호출 결과를 process memory에도 유지), False(SQLite 캐시만 사용), None: 변경 없음
+        :return:
+        """
+        with self._lock:
+            if cache_dir is not None and cache_dir != self.cache_dir:
+                self.cache_dir = cache_dir
+                self._close()
+            if replay_only is not None:
+                self.replay_only = replay_only
+            if source is not None:
+                self.stock_source = source
+                self.fdr_source = source
+                self.source_name = source.name
+            else:
+                self.stock_source = stock
+                self.fdr_source = fdr
+                self.source_name = None
+            if memory_cache is not None:
+                if not memory_cache:
+                    self.memory_cache = None
+                elif self.memory_cache is None:
+                    self.memory_cache = {}
+
+    def _close(self):
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._conn_pid = None
+
+    def _connect(self):
+        # 프로세스 단위로 connection 생성 (fork 이후 재사용 방지)
+        if self._conn is None or self._conn_pid != os.getpid():
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            self._conn = sqlite3.connect(os.path.join(self.cache_dir, 'market_data.sqlite'),
+                                         check_same_thread=False, timeout=60)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB)')
+            self._conn.commit()
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def get_derived_cache_dir(self, cache_dir):
+        """
+        :param cache_dir: 캐시 저장 경로
+        :return:
+        daily panel, factor store 등 시장 데이터에서 파생된 캐시 파일 경로
+        * source 사용 시 cache_dir/{source.name}/ (pykrx 데이터로 만든 파일과 섞이지 않음)
+        """
+        if self.source_name is None:
+            return cache_dir
+        return os.path.join(cache_dir, self.source_name)
+
+    def _make_key(self, name, *args, **kwargs):
+        if self.source_name is not None:
+            name = self.source_name + ':' + name
+        return json.dumps([name, list(args), kwargs], sort_keys=True, ensure_ascii=False)
+
+    def get_cached(self, name, *args, **kwargs):
+        """
+        :return:
+        캐시된 값 (없는 경우 _MISSING)
+        """
+        key = self._make_key(name, *args, **kwargs)
+        with self._lock:
+            row = self._connect().execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        return pickle.loads(row[0])
+
+    def put_cached(self, value, name, *args, **kwargs):
+        """
+        :param value: 저장할 값
+        :param name: 함수명 (e.g. 'get_market_ohlcv_by_date')
+        :return:
+        """
+        key = self._make_key(name, *args, **kwargs)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            conn = self._connect()
+            conn.execute('INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)', (key, blob))
+            conn.commit()
+
+    def _call(self, name, func, *args, **kwargs):
+        memory_cache = self.memory_cache
+        if memory_cache is not None:
+            key = self._make_key(name, *args, **kwargs)
+            if key not in memory_cache:
+                value = self._call_cached(name, func, *args, **kwargs)
+                if _is_empty(value):
+                    return value
+                memory_cache[key] = value
+            # 호출 측에서 index 등을 변경하는 경우가 있으므로 shallow copy 반환 (값 array는 공유)
+            value = memory_cache[key]
+            if isinstance(value, (pd.DataFrame, pd.Series)):
+                return value.copy(deep=False)
+            return copy.copy(value)
+        return self._call_cached(name, func, *args, **kwargs)
+
+    def _call_cached(self, name, func, *args, **kwargs):
+        value = self.get_cached(name, *args, **kwargs)
+        if value is not _MISSING:
+            return value
+        if self.replay_only:
+            raise CacheMissError(self._make_key(name, *args, **kwargs))
+        # 네트워크 오류 시 재시도
+        for n_try in range(self.max_retry):
+            try:
+                value = func(*args, **kwargs)
+                break
+            except Exception:
+                if n_try == self.max_retry - 1:
+                    raise
+                time.sleep(self.retry_interval)
+        # 빈 응답(휴장일, 일시적 오류 등)은 저장하지 않음 -> 다음 호출 시 다시 조회
+        if not _is_empty(value):
+            self.put_cached(value, name, *args, **kwargs)
+        return value
+
+    """
+    pykrx
+    """
+    def get_market_ohlcv_by_date(self, fromdate, todate, ticker, adjusted=True):
+        if adjusted:
+            return self._call('get_market_ohlcv_by_date', self.stock_source.get_market_ohlcv_by_date,
+                              fromdate, todate, ticker)
+        return self._call('get_market_ohlcv_by_date', self.stock_source.get_market_ohlcv_by_date,
+                          fromdate, todate, ticker, adjusted=False)
+
+    def get_market_ohlcv_by_ticker(self, date, market='KOSPI'):
+        return self._call('get_market_ohlcv_by_ticker', self.stock_source.get_market_ohlcv_by_ticker,
+                          date, market=market)
+
+    def get_etf_ohlcv_by_ticker(self, date):
+        return self._call('get_etf_ohlcv_by_ticker', self.stock_source.get_etf_ohlcv_by_ticker, date)
+
+    def get_index_ohlcv_by_date(self, fromdate, todate, ticker):
+        return self._call('get_index_ohlcv_by_date', self.stock_source.get_index_ohlcv_by_date,
+                          fromdate, todate, ticker)
+
+    def get_market_ticker_list(self, date, market='KOSPI'):
+        return self._call('get_market_ticker_list', self.stock_source.get_market_ticker_list, date, market=market)
+
+    def get_etf_ticker_list(self, date):
+        return self._call('get_etf_ticker_list', self.stock_source.get_etf_ticker_list, date)
+
+    def get_market_ticker_name(self, ticker):
+        return self._call('get_market_ticker_name', self.stock_source.get_market_ticker_name, ticker)
+
+    def get_etf_ticker_name(self, ticker):
+        return self._call('get_etf_ticker_name', self.stock_source.get_etf_ticker_name, ticker)
+
+    def get_nearest_business_day_in_a_week(self, date, prev=True):
+        return self._call('get_nearest_business_day_in_a_week', self.stock_source.get_nearest_business_day_in_a_week,
+                          date=date, prev=prev)
+
+    """
+    FinanceDataReader
+    """
+    def data_reader(self, symbol, start, end):
+        """
+        :param symbol: 지수 / 종목 코드 (e.g. 'KQ11')
+        :param start: 시작 일자
+        :param end: 종료 일자 (캐시 key에 포함되므로 생략하지 않음)
+        :return:
+        """
+        return self._call('DataReader', self.fdr_source.DataReader, symbol, start, end)
+
+
+"""
+provider: 모든 모듈이 공유하는 시장 데이터 제공자
+"""
+provider = _DataProvider()
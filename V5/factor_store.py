@@ -0,0 +1,141 @@
+"""
+factor_store.py
+"""
+import numpy as np
+import pandas as pd
+import hashlib
+import os
+from data_provider import provider
+from daily_panel import _DailyPanel
+
+"""
+_store_memory: keep_in_memory=True로 load한 factor store {id(daily panel): (_DailyPanel, _FactorStore)}
+* panel 객체가 같은 경우에만 사용 -> panel hash 계산 및 파일 로드 생략
+"""
+_store_memory = {}
+
+"""
+FACTOR_COLUMNS: 일자-종목별 factor (해당 일자 장 종료 기준)
+'MAD3', 'MAD5', 'MAD10', 'MAD20': N일 이동평균 대비 종가 (%)
+'IBS': (종가 - 저가) / (고가 - 저가)
+'거래량', '거래량순위': 거래량 및 전체 종목 중 거래량 순위 (1: 최대)
+'피벗', '피벗1차저항선', '피벗2차저항선', '피벗1차지지선', '피벗2차지지선': 익 거래일 피벗 값
+* 산식에서 변수명으로 사용하므로 공백 없는 이름 사용
+"""
+MAD_WINDOWS = [3, 5, 10, 20]
+FACTOR_COLUMNS = ['MAD' + str(window) for window in MAD_WINDOWS] + \
+                 ['IBS', '거래량', '거래량순위', '피벗', '피벗1차저항선', '피벗2차저항선', '피벗1차지지선', '피벗2차지지선']
+DEFAULT_FORMULA = '(순위(-MAD5) + 순위(IBS)) / 2'
+
+
+class _FactorStore(_DailyPanel):
+    """
+    일자 x 종목 x factor table (daily panel과 동일한 구조)
+    * daily panel에서 전체 기간 factor를 한 번만 계산하여 저장
+    """
+    COLUMNS = FACTOR_COLUMNS
+
+    def get_frame(self, date, code_list=None):
+        """
+        :param date: 기준 일자
+        :param code_list: 종목 리스트 (None: 전체 종목, 순서 유지)
+        :return:
+        df (index: 종목 코드, columns: FACTOR_COLUMNS, 데이터가 없는 종목은 NaN)
+        """
+        if code_list is None:
+            code_list = self.codes
+        rows = np.array([self.code_idx.get(code, -1) for code in code_list], dtype=np.int64)
+        values = self.data[self.date_idx[date], np.where(rows >= 0, rows, 0)]
+        values[rows < 0] = np.nan
+        df = pd.DataFrame(values, index=pd.Index(code_list, name='종목 코드'), columns=self.COLUMNS)
+        return df
+
+
+def compute_factors(daily_panel):
+    """
+    :param daily_panel: _DailyPanel
+    :return:
+    np.ndarray (len(dates), len(codes), len(FACTOR_COLUMNS))
+    """
+    high_idx, low_idx, close_idx, volume_idx = [daily_panel.column_idx[column] for column in ['고가', '저가', '종가', '거래량']]
+    data = daily_panel.data
+    high = data[:, :, high_idx]
+    low = data[:, :, low_idx]
+    close = data[:, :, close_idx]
+    volume = data[:, :, volume_idx]
+    factors = np.full(data.shape[:2] + (len(FACTOR_COLUMNS),), np.nan)
+
+    for k, window in enumerate(MAD_WINDOWS):
+        for d in range(window - 1, len(daily_panel.dates)):
+            factors[d, :, k] = close[d] / close[d - window + 1:d + 1].mean(axis=0) * 100
+    factor_idx = {column: i for i, column in enumerate(FACTOR_COLUMNS)}
+    factors[:, :, factor_idx['IBS']] = (close - low) / (high - low + 1e-4)
+    factors[:, :, factor_idx['거래량']] = volume
+    # 거래량 순위: 1 = 최대 거래량 (NaN 제외, 동일 거래량은 평균 순위)
+    factors[:, :, factor_idx['거래량순위']] = pd.DataFrame(volume).rank(axis=1, ascending=False).to_numpy()
+
+    pivot = (high + low + close) / 3
+    factors[:, :, factor_idx['피벗']] = pivot
+    factors[:, :, factor_idx['피벗1차저항선']] = 2 * pivot - low
+    factors[:, :, factor_idx['피벗2차저항선']] = pivot + high - low
+    factors[:, :, factor_idx['피벗1차지지선']] = 2 * pivot - high
+    factors[:, :, factor_idx['피벗2차지지선']] = pivot - high + low
+    return factors
+
+
+def load_factor_store(daily_panel, cache_dir='./cache/', keep_in_memory=False):
+    """
+    :param daily_panel: _DailyPanel
+    :param cache_dir: 캐시 저장 경로
+    :param keep_in_memory: True인 경우 process memory에 유지 (동일 panel 객체 재 실행 시 hash 계산 및 파일 로드 생략)
+    :return:
+    _FactorStore
+    * 동일 daily panel(기간, 종목, 값)에 대해 한 번만 계산 후 npz 캐시에서 로드 (시장 데이터 source별 경로)
+    * key에 panel 값 hash 포함 -> 수정주가 계수 사용 여부 / 계수 파일이 바뀌면 다시 계산
+    """
+    if keep_in_memory and id(daily_panel) in _store_memory and _store_memory[id(daily_panel)][0] is daily_panel:
+        return _store_memory[id(daily_panel)][1]
+    cache_dir = provider.get_derived_cache_dir(cache_dir)
+    md5 = hashlib.md5(('-'.join(daily_panel.codes)).encode('utf-8'))
+    md5.update(np.ascontiguousarray(daily_panel.data))
+    key = md5.hexdigest()[:8]
+    fname = os.path.join(cache_dir, 'factor_store_' + daily_panel.dates[0] + '_' + daily_panel.dates[-1] + '_' +
+                         key + '.npz')
+    if os.path.isfile(fname):
+        factor_store = _FactorStore.load(fname)
+    else:
+        factor_store = _FactorStore(daily_panel.dates, daily_panel.codes, compute_factors(daily_panel))
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        factor_store.save(fname)
+    if keep_in_memory:
+        _store_memory[id(daily_panel)] = (daily_panel, factor_store)
+    return factor_store
+
+
+def _evaluate(expression, df):
+    namespace = {column: df[column] for column in df.columns}
+    namespace['순위'] = lambda series: series.rank(ascending=True)
+    namespace['np'] = np
+    return eval(expression, {'__builtins__': {}}, namespace)
+
+
+def get_formula_ranking(factor_store, date, code_list=None, formula=DEFAULT_FORMULA, condition=None):
+    """
+    :param factor_store: _FactorStore
+    :param date: 기준 일자
+    :param code_list: 후보군 리스트 (None: 전체 종목)
+    :param formula: 순위 산식 (FACTOR_COLUMNS 및 순위() 사용, 작을수록 우선순위 높음)
+    e.g. '(순위(-MAD5) + 순위(IBS)) / 2': MAD 클수록, IBS 작을수록 우선 (get_ranking과 동일)
+    :param condition: 후보 조건 (None: 조건 없음, NaN 종목은 제외)
+    e.g. '(MAD5 > 100) & (MAD5 < 120)'
+    :return:
+    df (index: 종목 코드, columns: FACTOR_COLUMNS + ['점수']), 점수 오름차순
+    """
+    df = factor_store.get_frame(date, code_list)
+    if condition is not None:
+        with np.errstate(invalid='ignore'):
+            df = df[_evaluate(condition, df).fillna(False).astype(bool)].copy()
+    df['점수'] = _evaluate(formula, df)
+    df = df.sort_values(by='점수', ascending=True)
+    return df
@@ -0,0 +1,72 @@
+"""
+indicators.py
+"""
+import numpy as np
+
+
+class _RollingIndicators:
+    """
+    종목별 rolling 지표 상태
+    * 최근 max(windows)개 bar를 ring buffer에 유지 -> 새 bar 1개만 반영, 일별 O(window x 종목 수)
+    * window 내 NaN(미 상장, 데이터 없음)이 있는 경우 이동평균 NaN
+    * 이동평균은 buffer의 window개 bar를 일자 순서대로 평균 -> daily panel에서 직접 계산한 값과 bit 단위로 동일
+      (running sum 사용 시 끝자리 오차로 이격도 범위 경계 / 순위 동률 판단이 달라질 수 있음)
+    """
+    def __init__(self, codes, windows=(5,)):
+        """
+        :param codes: 종목 코드 리스트 (e.g. daily_panel.codes, ['KQ11'])
+        :param windows: 이동평균 window 리스트 (e.g. (3, 5, 10))
+        """
+        self.codes = list(codes)
+        self.code_idx = {code: i for i, code in enumerate(self.codes)}
+        self.windows = list(windows)
+        self.max_window = max(self.windows)
+        self.buffer = np.full((self.max_window, len(self.codes)), np.nan)
+        self.pos = 0
+        self.num_bars = 0
+        self.last_date = None
+
+    def update(self, date, values):
+        """
+        :param date: bar 일자
+        :param values: 종목별 값 array (codes 순서, e.g. 종가)
+        :return:
+        """
+        self.buffer[self.pos] = np.asarray(values, dtype=np.float64)
+        self.pos = (self.pos + 1) % self.max_window
+        self.num_bars += 1
+        self.last_date = date
+
+    def get_moving_average(self, window):
+        """
+        :param window: 이동평균 window (windows에 포함된 값)
+        :return:
+        종목별 이동평균 array (bar 수 부족 또는 window 내 NaN 포함 시 NaN)
+        """
+        if self.num_bars < window:
+            return np.full(len(self.codes), np.nan)
+        recent = self.buffer[[(self.pos - window + k) % self.max_window for k in range(window)]]
+        return recent.mean(axis=0)
+
+
+class _PanelIndicators(_RollingIndicators):
+    """
+    daily panel 종가 기반 rolling 지표
+    * advance_to(date)로 아직 반영하지 않은 일자의 bar만 차례로 반영
+    """
+    def __init__(self, daily_panel, windows=(5,)):
+        super().__init__(daily_panel.codes, windows)
+        self.daily_panel = daily_panel
+        self.close_idx = daily_panel.column_idx['종가']
+
+    def advance_to(self, date):
+        """
+        :param date: 기준 일자 (해당 일자 bar까지 반영)
+        :return:
+        """
+        d = self.daily_panel.date_idx[date]
+        start = self.daily_panel.date_idx[self.last_date] + 1 if self.last_date is not None else 0
+        if d < start - 1:
+            raise ValueError('이미 ' + self.last_date + '까지 반영됨: ' + date)
+        for i in range(start, d + 1):
+            self.update(self.daily_panel.dates[i], self.daily_panel.data[i, :, self.close_idx])
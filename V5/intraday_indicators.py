@@ -0,0 +1,104 @@
+"""
+intraday_indicators.py
+"""
+import numpy as np
+
+"""
+INDICATOR_NAMES: 매매일 종목 x bar 지표 (각 bar 종료 시점 기준, 산식에서 변수명으로 사용)
+'가격': 최근 체결 가격 (거래 없는 bar는 직전 가격, 첫 체결 이전 NaN)
+'거래량', '누적거래량': bar 거래량 및 당일 누적 거래량
+'VWAP': 당일 누적 거래대금 / 누적 거래량
+'MA{N}': 최근 N개 bar 가격 이동평균 (e.g. 'MA5', 'MA20')
+'시가범위고가', '시가범위저가': 장 시작 후 시가 범위(분) 고가 / 저가 (시가 범위 종료 이전 NaN)
+'수익률': 당일 첫 체결 가격 대비 수익률 (%)
+"""
+INDICATOR_NAMES = ['가격', '거래량', '누적거래량', 'VWAP', '시가범위고가', '시가범위저가', '수익률']
+
+
+class _IntradayIndicators:
+    """
+    _MinuteSeries 전체 종목의 장중 지표 (한 번에 vectorized 계산)
+    arrays: {지표 이름: np.ndarray (종목 수 x len(timestamp))}, row는 minute_series.code_idx와 동일
+    """
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def evaluate(self, expression):
+        """
+        :param expression: 지표 조건 산식 (e.g. '(가격 >= VWAP) & (수익률 < 3)')
+        :return:
+        np.ndarray (종목 수 x len(timestamp)) bool, NaN 비교는 False
+        """
+        namespace = dict(self.arrays)
+        namespace['np'] = np
+        with np.errstate(invalid='ignore'):
+            mask = eval(expression, {'__builtins__': {}}, namespace)
+        return np.asarray(mask, dtype=bool)
+
+
+def _forward_fill(price_matrix):
+    """
+    :return:
+    거래 없는 bar(가격 0)를 직전 체결 가격으로 채운 float array (첫 체결 이전 NaN)
+    """
+    traded = price_matrix > 0
+    last_idx = np.maximum.accumulate(np.where(traded, np.arange(price_matrix.shape[1]), 0), axis=1)
+    filled = np.take_along_axis(price_matrix, last_idx, axis=1).astype(np.float64)
+    filled[~np.maximum.accumulate(traded, axis=1)] = np.nan
+    return filled
+
+
+def _moving_average(filled, window):
+    # NaN은 첫 체결 이전에만 존재 -> window 내 유효 bar 수가 window인 경우만 계산
+    valid = ~np.isnan(filled)
+    values_sum = np.cumsum(np.where(valid, filled, 0), axis=1)
+    valid_count = np.cumsum(valid, axis=1)
+    values_sum[:, window:] = values_sum[:, window:] - values_sum[:, :-window]
+    valid_count[:, window:] = valid_count[:, window:] - valid_count[:, :-window]
+    return np.where(valid_count == window, values_sum / window, np.nan)
+
+
+def compute_intraday_indicators(minute_series, ma_windows=(5, 20), opening_range=30):
+    """
+    :param minute_series: _MinuteSeries (load_all 이후)
+    :param ma_windows: 이동평균 bar 수 리스트
+    :param opening_range: 시가 범위 (분, N분봉 사용 시 bar 수로 환산)
+    :return:
+    _IntradayIndicators
+    """
+    price_matrix = minute_series.price_matrix
+    volume_matrix = minute_series.volume_matrix
+    filled = _forward_fill(price_matrix)
+    arrays = {'가격': filled, '거래량': volume_matrix}
+
+    cumulative_volume = np.cumsum(volume_matrix, axis=1)
+    cumulative_value = np.cumsum(price_matrix * volume_matrix.astype(np.float64), axis=1)
+    arrays['누적거래량'] = cumulative_volume
+    with np.errstate(invalid='ignore', divide='ignore'):
+        arrays['VWAP'] = np.where(cumulative_volume > 0, cumulative_value / cumulative_volume, np.nan)
+
+    for window in ma_windows:
+        arrays['MA' + str(window)] = _moving_average(filled, window)
+
+    # 시가 범위: 첫 num_bars개 bar의 고가 / 저가 (N분봉은 bar 고가 / 저가 사용)
+    num_bars = min(-(-opening_range // minute_series.bar_size), price_matrix.shape[1])
+    high_matrix = minute_series.high_matrix if minute_series.bar_size > 1 else price_matrix
+    low_matrix = minute_series.low_matrix if minute_series.bar_size > 1 else price_matrix
+    traded = price_matrix[:, :num_bars] > 0
+    with np.errstate(invalid='ignore'):
+        range_high = np.where(traded, high_matrix[:, :num_bars], -np.inf).max(axis=1, initial=-np.inf)
+        range_low = np.where(traded, low_matrix[:, :num_bars], np.inf).min(axis=1, initial=np.inf)
+    range_high[np.isinf(range_high)] = np.nan
+    range_low[np.isinf(range_low)] = np.nan
+    arrays['시가범위고가'] = np.full(filled.shape, np.nan)
+    arrays['시가범위저가'] = np.full(filled.shape, np.nan)
+    if num_bars > 0:
+        arrays['시가범위고가'][:, num_bars - 1:] = range_high[:, None]
+        arrays['시가범위저가'][:, num_bars - 1:] = range_low[:, None]
+
+    # 당일 첫 체결 가격 대비 수익률
+    first_idx = np.argmax(price_matrix > 0, axis=1)
+    first_price = price_matrix[np.arange(price_matrix.shape[0]), first_idx].astype(np.float64)
+    first_price[first_price <= 0] = np.nan
+    arrays['수익률'] = (filled / first_price[:, None] - 1) * 100
+    return _IntradayIndicators(arrays)
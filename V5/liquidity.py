@@ -0,0 +1,88 @@
+"""
+liquidity.py
+"""
+import numpy as np
+import os
+from minute_store import has_minute_partition, load_minute_partition
+
+"""
+LIQUIDITY_COLUMNS: 종목-일자별 유동성 지표
+'거래 분 수': 가격 및 거래량이 있는 분 수
+'거래량 0 비율': 전체 분 중 거래가 없는 분의 비율
+'분 거래량 중앙값': 분 거래량 중앙값
+'시초 거래량': 장 시작 후 OPENING_WINDOW분 거래량 합 (매수/매도 최대 5분 체결 구간)
+"""
+LIQUIDITY_COLUMNS = ['거래 분 수', '거래량 0 비율', '분 거래량 중앙값', '시초 거래량']
+OPENING_WINDOW = 5
+
+
+def compute_liquidity(price_matrix, volume_matrix):
+    """
+    :param price_matrix: 종목 수 x 분 가격
+    :param volume_matrix: 종목 수 x 분 거래량
+    :return:
+    종목 수 x len(LIQUIDITY_COLUMNS) 유동성 지표
+    """
+    traded = (price_matrix > 0) & (volume_matrix > 0)
+    liquidity = np.zeros((price_matrix.shape[0], len(LIQUIDITY_COLUMNS)), dtype=np.float64)
+    if price_matrix.shape[0] == 0:
+        return liquidity
+    liquidity[:, 0] = traded.sum(axis=1)
+    liquidity[:, 1] = 1 - traded.mean(axis=1)
+    liquidity[:, 2] = np.median(volume_matrix, axis=1)
+    liquidity[:, 3] = volume_matrix[:, :OPENING_WINDOW].sum(axis=1)
+    return liquidity
+
+
+def load_liquidity(store_dir, date):
+    """
+    :param store_dir: minute_store 경로
+    :param date: 일자
+    :return:
+    code_idx {code: row}, 유동성 지표 array
+    * store_dir/{date}/liquidity.npy가 없는 경우 1회 계산 후 저장
+    * 해당 일자 partition이 없는 경우 None, None
+    """
+    if not has_minute_partition(store_dir, date):
+        return None, None
+    code_idx, price, volume = load_minute_partition(store_dir, date)
+    fname = os.path.join(store_dir, date, 'liquidity.npy')
+    if os.path.isfile(fname):
+        liquidity = np.load(fname)
+        if liquidity.shape[0] == len(code_idx):
+            return code_idx, liquidity
+    liquidity = compute_liquidity(price, volume)
+    np.save(fname, liquidity)
+    return code_idx, liquidity
+
+
+def exclude_illiquid_stocks(date, code_list, store_dir, liquidity_condition):
+    """
+    :param date: 유동성 기준 일자 (e.g. 전 거래일)
+    :param code_list: 종목 리스트
+    :param store_dir: minute_store 경로
+    :param liquidity_condition: transaction_params['유동성 조건'][1]
+    {'최소 거래 분 수': 300, '최대 거래량 0 비율': 0.3, '최소 분 거래량 중앙값': 10, '최소 시초 거래량': 100}
+    :return:
+    유동성 조건을 만족하는 종목 리스트
+    * 해당 일자 partition이 없는 경우 제외하지 않음
+    * partition에 없는 종목(당일 데이터 없음)은 제외
+    """
+    code_idx, liquidity = load_liquidity(store_dir, date)
+    if code_idx is None:
+        return code_list
+    new_code_list = []
+    for code in code_list:
+        if code not in code_idx:
+            continue
+        traded_minutes, zero_volume_ratio, median_volume, opening_volume = liquidity[code_idx[code]]
+        if traded_minutes < liquidity_condition.get('최소 거래 분 수', 0):
+            continue
+        if zero_volume_ratio > liquidity_condition.get('최대 거래량 0 비율', 1):
+            continue
+        if median_volume < liquidity_condition.get('최소 분 거래량 중앙값', 0):
+            continue
+        if opening_volume < liquidity_condition.get('최소 시초 거래량', 0):
+            continue
+        new_code_list.append(code)
+    return new_code_list
@@ -0,0 +1,281 @@
+"""
+minute_store.py
+"""
+import numpy as np
+import hashlib
+import json
+import operator
+import os
+
+"""
+TIMESTAMP: 분 단위 데이터 시간 축
+['0901', '0902', ..., '1520', '1530']
+"""
+TIMESTAMP = ['0901', '0902', '0903', '0904', '0905', '0906', '0907', '0908', '0909', '0910', '0911', '0912', '0913', '0914', '0915', '0916', '0917', '0918', '0919', '0920', '0921', '0922', '0923', '0924', '0925', '0926', '0927', '0928', '0929', '0930', '0931', '0932', '0933', '0934', '0935', '0936', '0937', '0938', '0939', '0940', '0941', '0942', '0943', '0944', '0945', '0946', '0947', '0948', '0949', '0950', '0951', '0952', '0953', '0954', '0955', '0956', '0957', '0958', '0959', '1000', '1001', '1002', '1003', '1004', '1005', '1006', '1007', '1008', '1009', '1010', '1011', '1012', '1013', '1014', '1015', '1016', '1017', '1018', '1019', '1020', '1021', '1022', '1023', '1024', '1025', '1026', '1027', '1028', '1029', '1030', '1031', '1032', '1033', '1034', '1035', '1036', '1037', '1038', '1039', '1040', '1041', '1042', '1043', '1044', '1045', '1046', '1047', '1048', '1049', '1050', '1051', '1052', '1053', '1054', '1055', '1056', '1057', '1058', '1059', '1100', '1101', '1102', '1103', '1104', '1105', '1106', '1107', '1108', '1109', '1110', '1111', '1112', '1113', '1114', '1115', '1116', '1117', '1118', '1119', '1120', '1121', '1122', '1123', '1124', '1125', '1126', '1127', '1128', '1129', '1130', '1131', '1132', '1133', '1134', '1135', '1136', '1137', '1138', '1139', '1140', '1141', '1142', '1143', '1144', '1145', '1146', '1147', '1148', '1149', '1150', '1151', '1152', '1153', '1154', '1155', '1156', '1157', '1158', '1159', '1200', '1201', '1202', '1203', '1204', '1205', '1206', '1207', '1208', '1209', '1210', '1211', '1212', '1213', '1214', '1215', '1216', '1217', '1218', '1219', '1220', '1221', '1222', '1223', '1224', '1225', '1226', '1227', '1228', '1229', '1230', '1231', '1232', '1233', '1234', '1235', '1236', '1237', '1238', '1239', '1240', '1241', '1242', '1243', '1244', '1245', '1246', '1247', '1248', '1249', '1250', '1251', '1252', '1253', '1254', '1255', '1256', '1257', '1258', '1259', '1300', '1301', '1302', '1303', '1304', '1305', '1306', '1307', '1308', '1309', '1310', '1311', '1312', '1313', '1314', '1315', '1316', '1317', '1318', '1319', '1320', '1321', '1322', '1323', '1324', '1325', '1326', '1327', '1328', '1329', '1330', '1331', '1332', '1333', '1334', '1335', '1336', '1337', '1338', '1339', '1340', '1341', '1342', '1343', '1344', '1345', '1346', '1347', '1348', '1349', '1350', '1351', '1352', '1353', '1354', '1355', '1356', '1357', '1358', '1359', '1400', '1401', '1402', '1403', '1404', '1405', '1406', '1407', '1408', '1409', '1410', '1411', '1412', '1413', '1414', '1415', '1416', '1417', '1418', '1419', '1420', '1421', '1422', '1423', '1424', '1425', '1426', '1427', '1428', '1429', '1430', '1431', '1432', '1433', '1434', '1435', '1436', '1437', '1438', '1439', '1440', '1441', '1442', '1443', '1444', '1445', '1446', '1447', '1448', '1449', '1450', '1451', '1452', '1453', '1454', '1455', '1456', '1457', '1458', '1459', '1500', '1501', '1502', '1503', '1504', '1505', '1506', '1507', '1508', '1509', '1510', '1511', '1512', '1513', '1514', '1515', '1516', '1517', '1518', '1519', '1520', '1530']
+TIME_IDX = {time: i for i, time in enumerate(TIMESTAMP)}
+_TIME_LUT = np.full(10000, -1, dtype=np.int64)
+_TIME_LUT[[int(time) for time in TIMESTAMP]] = np.arange(len(TIMESTAMP))
+_RECORD_GETTER = operator.itemgetter('time', 'price', 'volumes')
+
+
+def _get_code_date_dict(data_dir):
+    """
+    :param data_dir: 분 단위 데이터 경로 (e.g. 'C:/Git/Data/수정/minute_Data/')
+    :return:
+    {code: set(dates)}
+    """
+    code_date_dict = {}
+    for A_code in os.listdir(data_dir):
+        code_dir = os.path.join(data_dir, A_code)
+        if not os.path.isdir(code_dir):
+            continue
+        code_date_dict[A_code[1:]] = set(file_name[:-5] for file_name in os.listdir(code_dir)
+                                         if file_name.endswith('.json'))
+    return code_date_dict
+
+
+def _to_array(value_list):
+    array = np.asarray(value_list)
+    # null 포함 시 NaN
+    return array.astype(np.float64) if array.dtype == object else array
+
+
+def read_minute_json(file_name):
+    """
+    :param file_name: A{code}/{date}.json (orient='table')
+    :return:
+    time_idx array (TIMESTAMP 기준), 가격 array, 거래량 array
+    * pandas 없이 json을 직접 parsing
+    * TIMESTAMP에 없는 시각은 제외, 파일 내 순서 유지
+    """
+    with open(file_name, 'r') as f:
+        records = json.load(f)['data']
+    if len(records) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    time_list, price_list, volume_list = zip(*map(_RECORD_GETTER, records))
+    time_array = np.asarray(time_list)
+    # 빠른 경로: 모든 시각이 'HHMM' 4자리 숫자 문자열인 경우 (크롤링 데이터 형식, e.g. '0901')
+    # -> int 변환 후 lookup table로 TIMESTAMP idx 변환
+    # * 그 외 형식(e.g. '901', '09:01', 숫자 type)은 TIME_IDX 조회 (TIMESTAMP에 없는 시각 제외)
+    if time_array.dtype == np.dtype('<U4') and (np.char.str_len(time_array) == 4).all() and \
+            np.char.isdigit(time_array).all():
+        time_idx = _TIME_LUT[time_array.astype(np.int64)]
+    else:
+        time_idx = np.array([TIME_IDX.get(time, -1) for time in time_list])
+    valid = time_idx >= 0
+    return time_idx[valid], _to_array(price_list)[valid], _to_array(volume_list)[valid]
+
+
+def read_minute_grid(file_name):
+    """
+    :param file_name: A{code}/{date}.json
+    :return:
+    가격 array, 거래량 array (TIMESTAMP 기준, 데이터 없는 시각은 0)
+    """
+    time_idx, price_array, volume_array = read_minute_json(file_name)
+    price = np.zeros(len(TIMESTAMP), dtype=price_array.dtype if price_array.dtype.kind == 'f' else np.int64)
+    volume = np.zeros(len(TIMESTAMP), dtype=volume_array.dtype if volume_array.dtype.kind == 'f' else np.int64)
+    # 동일 시각 중복 시 첫 번째 데이터 사용
+    time_idx, first = np.unique(time_idx, return_index=True)
+    price[time_idx] = price_array[first]
+    volume[time_idx] = volume_array[first]
+    return price, volume
+
+
+def get_bar_edges(bar_size):
+    """
+    :param bar_size: N분봉 (e.g. 5)
+    :return:
+    N분봉별 시작 idx array (TIMESTAMP 기준)
+    * 정규장('0901' ~ '1520')은 N분 단위로 묶고, 동시호가('1530')는 별도 bar
+    """
+    return np.append(np.arange(0, len(TIMESTAMP) - 1, bar_size), len(TIMESTAMP) - 1)
+
+
+def get_bar_timestamp(bar_size):
+    """
+    :param bar_size: N분봉 (1: 원본 분 단위)
+    :return:
+    N분봉 시간 축 (bar 마지막 분 기준, e.g. 5분봉: ['0905', '0910', ..., '1520', '1530'])
+    """
+    edges = get_bar_edges(bar_size)
+    ends = np.append(edges[1:], len(TIMESTAMP)) - 1
+    return [TIMESTAMP[end] for end in ends]
+
+
+def resample_minute_row(price, volume, bar_size):
+    """
+    :param price: 분 가격 array (TIMESTAMP 기준, 거래 없는 시각은 0)
+    :param volume: 분 거래량 array
+    :param bar_size: N분봉 (e.g. 5)
+    :return:
+    N분봉 고가, 저가, 종가, 거래량 array (len(get_bar_timestamp(bar_size)))
+    * bar 내 거래가 없는 경우 0
+    """
+    edges = get_bar_edges(bar_size)
+    traded = price > 0
+    high = np.maximum.reduceat(np.where(traded, price, 0), edges)
+    low = np.minimum.reduceat(np.where(traded, price, np.inf), edges)
+    low = np.where(np.isinf(low), 0, low).astype(price.dtype)
+    last_idx = np.maximum.reduceat(np.where(traded, np.arange(len(price)), -1), edges)
+    close = np.where(last_idx >= 0, price[np.maximum(last_idx, 0)], 0).astype(price.dtype)
+    return high.astype(price.dtype), low, close, np.add.reduceat(volume, edges)
+
+
+def convert_minute_tree(data_dir, store_dir, dates=None):
+    """
+    :param data_dir: 분 단위 데이터 경로 (A{code}/{date}.json)
+    :param store_dir: 저장 경로
+    :param dates: 변환 일자 리스트 (None: 전체)
+    :return:
+    A{code}/{date}.json 데이터를 일자별 column 파일로 변환
+    store_dir/{date}/codes.json: 종목 코드 리스트 (row 순서)
+    store_dir/{date}/price.npy: 가격 (종목 수 x len(TIMESTAMP)), int32 (정수가 아닌 가격 포함 시 float64)
+    store_dir/{date}/volume.npy: 거래량 (종목 수 x len(TIMESTAMP)), int64
+    """
+    code_date_dict = _get_code_date_dict(data_dir)
+    if dates is None:
+        dates = sorted(set().union(*code_date_dict.values()))
+    for date in dates:
+        code_list = sorted(code for code, date_set in code_date_dict.items() if date in date_set)
+        write_minute_partition(data_dir, store_dir, date, code_list)
+    update_manifest(store_dir, dates)
+
+
+def ingest_minute_tree(data_dir, store_dir, cache_dir='./cache/', dates=None):
+    """
+    :param data_dir: 분 단위 데이터 경로 (A{code}/{date}.json)
+    :param store_dir: 저장 경로
+    :param cache_dir: availability index 저장 경로
+    :param dates: 강제 재 변환 일자 리스트 (e.g. 기존 파일 수정 시, None: 없음)
+    :return:
+    변경된 일자 리스트
+    * 새 일자 또는 종목 리스트가 바뀐 일자의 partition만 변환 (기존 partition은 그대로 사용)
+    * 기존 파일 내용 변경은 감지하지 않음 -> 해당 일자를 dates로 지정하여 재 변환
+    * manifest의 data version을 올리고 변경 일자의 checksum 갱신
+    """
+    from availability import load_availability_index
+    availability = load_availability_index(data_dir, cache_dir=cache_dir)
+    date_code_dict = {}
+    for code, date_set in availability.code_dates.items():
+        for date in date_set:
+            date_code_dict.setdefault(date, []).append(code)
+
+    force_dates = set(dates) if dates is not None else set()
+    changed_dates = []
+    for date in sorted(date_code_dict):
+        code_list = sorted(date_code_dict[date])
+        if date not in force_dates and has_minute_partition(store_dir, date):
+            with open(os.path.join(store_dir, date, 'codes.json'), 'r') as f:
+                if json.load(f) == code_list:
+                    continue
+        write_minute_partition(data_dir, store_dir, date, code_list)
+        changed_dates.append(date)
+    update_manifest(store_dir, changed_dates)
+    return changed_dates
+
+
+def load_manifest(store_dir):
+    """
+    :param store_dir: 저장 경로
+    :return:
+    {'version': data version, 'partitions': {일자: {'version': 변경 시 version, 'num_codes': 종목 수, 'checksum': md5}}}
+    """
+    fname = os.path.join(store_dir, 'manifest.json')
+    if not os.path.isfile(fname):
+        return {'version': 0, 'partitions': {}}
+    with open(fname, 'r') as f:
+        return json.load(f)
+
+
+def update_manifest(store_dir, dates):
+    """
+    :param store_dir: 저장 경로
+    :param dates: 변경된 일자 리스트
+    :return:
+    갱신된 manifest (변경 일자가 없으면 version 유지)
+    """
+    manifest = load_manifest(store_dir)
+    if not dates:
+        return manifest
+    manifest['version'] += 1
+    for date in dates:
+        date_dir = os.path.join(store_dir, date)
+        md5 = hashlib.md5()
+        for file_name in ['codes.json', 'price.npy', 'volume.npy']:
+            with open(os.path.join(date_dir, file_name), 'rb') as f:
+                md5.update(f.read())
+        with open(os.path.join(date_dir, 'codes.json'), 'r') as f:
+            num_codes = len(json.load(f))
+        manifest['partitions'][date] = {'version': manifest['version'], 'num_codes': num_codes,
+                                        'checksum': md5.hexdigest()}
+    with open(os.path.join(store_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def write_minute_partition(data_dir, store_dir, date, code_list):
+    """
+    :param data_dir: 분 단위 데이터 경로
+    :param store_dir: 저장 경로
+    :param date: 일자
+    :param code_list: 해당 일자 데이터 보유 종목 리스트
+    :return:
+    해당 일자 column 파일 경로
+    """
+    price = np.zeros((len(code_list), len(TIMESTAMP)), dtype=np.float64)
+    volume = np.zeros((len(code_list), len(TIMESTAMP)), dtype=np.int64)
+    for i, code in enumerate(code_list):
+        file_name = os.path.join(data_dir, 'A' + code, date + '.json')
+        price[i], volume[i] = read_minute_grid(file_name)
+    if np.array_equal(price, np.round(price)) and np.abs(price).max(initial=0) < np.iinfo(np.int32).max:
+        price = price.astype(np.int32)
+
+    date_dir = os.path.join(store_dir, date)
+    if not os.path.isdir(date_dir):
+        os.makedirs(date_dir)
+    # 기존 partition 재 변환 시 codes.json 및 partition 하위 캐시(liquidity.npy 등) 무효화
+    for file_name in os.listdir(date_dir):
+        if file_name not in ('price.npy', 'volume.npy'):
+            os.remove(os.path.join(date_dir, file_name))
+    np.save(os.path.join(date_dir, 'price.npy'), price)
+    np.save(os.path.join(date_dir, 'volume.npy'), volume)
+    # codes.json은 마지막에 저장 (변환 중단 시 불완전 partition 사용 방지)
+    with open(os.path.join(date_dir, 'codes.json'), 'w') as f:
+        json.dump(code_list, f)
+    return date_dir
+
+
+def has_minute_partition(store_dir, date):
+    return os.path.isfile(os.path.join(store_dir, date, 'codes.json'))
+
+
+def load_minute_partition(store_dir, date):
+    """
+    :param store_dir: 저장 경로
+    :param date: 일자
+    :return:
+    code_idx {code: row}, 가격 matrix, 거래량 matrix
+    * matrix는 memory-map (복사 없이 필요한 row만 읽음)
+    """
+    date_dir = os.path.join(store_dir, date)
+    with open(os.path.join(date_dir, 'codes.json'), 'r') as f:
+        code_list = json.load(f)
+    price = np.load(os.path.join(date_dir, 'price.npy'), mmap_mode='r')
+    volume = np.load(os.path.join(date_dir, 'volume.npy'), mmap_mode='r')
+    code_idx = {code: i for i, code in enumerate(code_list)}
+    return code_idx, price, volume
+
+
+if __name__ == '__main__':
+    """
+    Usage: python minute_store.py <data_dir> <store_dir> [date1 date2 ...]
+           python minute_store.py ingest <data_dir> <store_dir> [재 변환 date1 date2 ...]
+    """
+    import sys
+    if sys.argv[1] == 'ingest':
+        changed_dates = ingest_minute_tree(sys.argv[2], sys.argv[3], dates=sys.argv[4:] if len(sys.argv) > 4 else None)
+        print('변경 일자:', changed_dates)
+        print('data version:', load_manifest(sys.argv[3])['version'])
+    else:
+        convert_minute_tree(sys.argv[1], sys.argv[2], sys.argv[3:] if len(sys.argv) > 3 else None)
@@ -0,0 +1,124 @@
+"""
+regime.py
+"""
+import numpy as np
+from datetime import datetime, timedelta
+from data_provider import provider
+
+"""
+DEFAULT_REGIME_CONDITION: 기존 매수 조건 (KOSDAQ 종가가 MA3 / MA5 / MA10 중 하나 이상 이상)
+'규칙': [지수 코드, 규칙 종류, 인자...] 리스트
+    [지수, '이동평균', N]: 종가 >= N일 이동평균
+    [지수, '이동평균 교차', N, M]: N일 이동평균 >= M일 이동평균
+    [지수, '변동성', N, X]: N일 일간 수익률(%) 표준편차 <= X
+'최소 충족 규칙 수': 충족 규칙 수가 이 값 이상인 일자만 매수 허용 (1: OR, len(규칙): AND)
+* 지수 코드: FinanceDataReader symbol (e.g. 'KQ11', 'KS11', '069500')
+"""
+DEFAULT_REGIME_CONDITION = {
+    '규칙': [['KQ11', '이동평균', 3], ['KQ11', '이동평균', 5], ['KQ11', '이동평균', 10]],
+    '최소 충족 규칙 수': 1,
+}
+
+
+class _RegimeSeries:
+    """
+    dates_list와 같은 순서의 시장 국면 array
+    * rule_flags[r, d]: d일 장 종료 기준 r번째 규칙 충족 여부
+    * num_matched[d]: d일 충족 규칙 수, flags[d]: d일 기준 매수 허용 여부
+    * 매매일 i는 전 거래일 값(flags[i - 1]) 사용
+    """
+    def __init__(self, dates_list, rules, rule_flags, min_num_rules):
+        self.dates_list = list(dates_list)
+        self.rules = rules
+        self.rule_flags = rule_flags
+        self.num_matched = rule_flags.sum(axis=0)
+        self.flags = self.num_matched >= min_num_rules
+
+
+def _get_required_bars(rule):
+    _, kind, *args = rule
+    if kind == '이동평균':
+        return args[0]
+    if kind == '이동평균 교차':
+        return max(args[0], args[1])
+    if kind == '변동성':
+        return args[0] + 1
+    raise ValueError('지원하지 않는 시장 국면 규칙: ' + str(kind))
+
+
+def _load_index_close(symbol, df_start_date, end_date):
+    """
+    :return:
+    일자 리스트 ('%Y%m%d'), 종가 array (df_start_date ~ end_date)
+    """
+    df = provider.data_reader(symbol, df_start_date, end_date)
+    index_dates = [datetime.strftime(date, "%Y%m%d") for date in df.index]
+    return index_dates, df['Close'].to_numpy(dtype=np.float64)
+
+
+def _compute_rule(rule, close):
+    """
+    :param rule: [지수, 규칙 종류, 인자...]
+    :param close: 지수 종가 array (지수 일자 기준)
+    :return:
+    지수 일자별 규칙 충족 여부 bool array (bar 수 부족 시 False)
+    """
+    _, kind, *args = rule
+    with np.errstate(invalid='ignore'):
+        if kind == '이동평균':
+            return close >= _get_moving_averages(close, args[0])
+        if kind == '이동평균 교차':
+            return _get_moving_averages(close, args[0]) >= _get_moving_averages(close, args[1])
+        if kind == '변동성':
+            window, max_pct = args
+            returns = np.full(len(close), np.nan)
+            returns[1:] = (close[1:] / close[:-1] - 1) * 100
+            std = np.full(len(close), np.nan)
+            if len(close) > window:
+                windows = np.lib.stride_tricks.sliding_window_view(returns[1:], window)
+                std[window:] = windows.std(axis=1, ddof=1)
+            return std <= max_pct
+    raise ValueError('지원하지 않는 시장 국면 규칙: ' + str(kind))
+
+
+def _get_moving_averages(close, window):
+    # 전체 구간 sliding window 평균 (bar 수 부족 또는 window 내 NaN 포함 시 NaN)
+    moving_averages = np.full(len(close), np.nan)
+    if len(close) >= window:
+        moving_averages[window - 1:] = np.lib.stride_tricks.sliding_window_view(close, window).mean(axis=1)
+    return moving_averages
+
+
+def compute_regime(dates_list, start_date, regime_condition=None):
+    """
+    :param dates_list: 거래일 리스트 ('%Y%m%d')
+    :param start_date: 시작 일자 (지수 데이터 조회 기준)
+    :param regime_condition: DEFAULT_REGIME_CONDITION 형식 (None: 기본 조건)
+    :return:
+    _RegimeSeries
+    * 지수별 데이터는 한 번만 load, 규칙별 전체 기간 계산 후 dates_list 기준으로 정렬 (지수 일자 중 해당 일자 이하 최근 값)
+    """
+    if regime_condition is None:
+        regime_condition = DEFAULT_REGIME_CONDITION
+    rules = regime_condition['규칙']
+    min_num_rules = regime_condition.get('최소 충족 규칙 수', 1)
+
+    # 가장 긴 규칙 기준으로 이전 데이터 확보 (거래일 1일 ~ 달력 2일)
+    lookback_days = max([20] + [_get_required_bars(rule) * 2 for rule in rules])
+    df_start_date = datetime.strftime(datetime.strptime(start_date, "%Y%m%d") - timedelta(days=lookback_days),
+                                      "%Y%m%d")
+    df_start_date = provider.get_nearest_business_day_in_a_week(date=df_start_date, prev=True)
+
+    index_data = {}
+    rule_flags = np.zeros((len(rules), len(dates_list)), dtype=bool)
+    for r, rule in enumerate(rules):
+        symbol = rule[0]
+        if symbol not in index_data:
+            index_data[symbol] = _load_index_close(symbol, df_start_date, dates_list[-1])
+        index_dates, close = index_data[symbol]
+        if len(close) == 0:
+            continue
+        flags = _compute_rule(rule, close)
+        pos = np.searchsorted(np.array(index_dates), np.array(dates_list), side='right') - 1
+        rule_flags[r] = np.where(pos >= 0, flags[np.maximum(pos, 0)], False)
+    return _RegimeSeries(dates_list, rules, rule_flags, min_num_rules)
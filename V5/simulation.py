@@ -1,76 +1,99 @@
 """
 simulation.py
 """
-from pykrx import stock
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import json
-import FinanceDataReader as fdr
-from transaction import _transaction
+from transaction import _transaction, _MinuteSeries
 from Balance import _Balance
 from analyze_results import _analyze_results, _save_balance
+from data_provider import provider, CacheMissError
+from daily_panel import load_daily_panel
+from availability import load_availability_index
+from liquidity import exclude_illiquid_stocks
+from adjustment import load_adjusted_panel
+from synthetic_market import _SyntheticMarket
+from indicators import _PanelIndicators
+from factor_store import load_factor_store, get_formula_ranking
+from regime import compute_regime
+from volume_leaders import load_volume_leaders
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import time
 import os
 
 """
 Functions
 """
-def save_stock_code_list(stock_data_dir):
+def save_stock_code_list(stock_availability):
     """
+    :param stock_availability: 주식 분 단위 데이터 _AvailabilityIndex
     :return:
     오늘 기준 상장 기업 리스트
     """
     ref_date = datetime.strftime(datetime.now().date(), "%Y%m%d")
     code_set = set([])
-    tickers1 = stock.get_market_ticker_list(ref_date, market="KOSPI")
+    tickers1 = provider.get_market_ticker_list(ref_date, market="KOSPI")
     code_set.update(tickers1)
-    tickers2 = stock.get_market_ticker_list(ref_date, market="KOSDAQ")
+    tickers2 = provider.get_market_ticker_list(ref_date, market="KOSDAQ")
     code_set.update(tickers2)
-    code_list = list(code_set)
-
-    file_code_list = os.listdir(stock_data_dir)
-    for i in range(len(file_code_list)):
-        file_code_list[i] = file_code_list[i][1:]
-
-    code_list = [code for code in code_list if code in file_code_list]
+    code_list = list(code_set & stock_availability.get_code_set())
     with open('krx_codes.json', 'w') as f:
         json.dump(code_list, f)
+    return code_list
 
-def save_ETF_code_list(ETF_data_dir):
+def save_ETF_code_list(ETF_availability):
     """
+    :param ETF_availability: ETF 분 단위 데이터 _AvailabilityIndex
     :return:
     오늘 기준 상장 ETF 리스트
     """
     ref_date = datetime.strftime(datetime.now().date(), "%Y%m%d")
-    tickers = stock.get_etf_ticker_list(ref_date)
-
-    file_code_list = os.listdir(ETF_data_dir)
-    for i in range(len(file_code_list)):
-        file_code_list[i] = file_code_list[i][1:]
+    tickers = provider.get_etf_ticker_list(ref_date)
 
-    tickers = [ticker for ticker in tickers if ticker in file_code_list]
+    file_code_set = ETF_availability.get_code_set()
+    tickers = [ticker for ticker in tickers if ticker in file_code_set]
     with open('ETF_codes.json', 'w') as f:
         json.dump(tickers, f)
+    return tickers
 
-def get_MAD_and_IBS(code: str, date:str):
+def get_MAD_and_IBS_array(code_list, date: str, daily_panel, panel_indicators=None):
     """
-    :param code: 종목 코드 (e.g. '005930')
+    :param code_list: 종목 코드 리스트
     :param date: 기준 일자 (e.g. '20210602')
+    :param daily_panel: _DailyPanel
+    :param panel_indicators: _PanelIndicators (MA5 rolling 상태, None: daily panel에서 직접 계산)
     :return:
-    이격도 값, IBS 값
+    이격도 array, IBS array (code_list 순서, 데이터가 없는 경우 NaN)
+    * 전체 종목을 한 번에 계산 (MAD: 종가 / MA5 x 100, IBS: (종가 - 저가) / (고가 - 저가))
     """
-    temp = stock.get_market_ohlcv_by_date(datetime.strftime(datetime.strptime(date, "%Y%m%d") - timedelta(days=15), "%Y%m%d"), date, code)
-    temp['MA5'] = temp['종가'].rolling(window=5).mean()
-    MAD = temp.iloc[-1]['종가'] / temp.iloc[-1]['MA5'] * 100
-    IBS = (temp.iloc[-1]['종가'] - temp.iloc[-1]['저가']) / (temp.iloc[-1]['고가'] - temp.iloc[-1]['저가'] + 1e-4)
+    d = daily_panel.date_idx[date]
+    rows = np.array([daily_panel.code_idx.get(code, -1) for code in code_list], dtype=np.int64)
+    has_data = rows >= 0
+    rows = np.where(has_data, rows, 0)
+    close_idx, high_idx, low_idx = [daily_panel.column_idx[column] for column in ['종가', '고가', '저가']]
+    if panel_indicators is not None:
+        panel_indicators.advance_to(date)
+        MA5 = panel_indicators.get_moving_average(5)[rows]
+    elif d >= 4:
+        MA5 = daily_panel.data[d - 4:d + 1, rows, close_idx].mean(axis=0)
+    else:
+        MA5 = np.full(len(rows), np.nan)
+    close = daily_panel.data[d, rows, close_idx]
+    high = daily_panel.data[d, rows, high_idx]
+    low = daily_panel.data[d, rows, low_idx]
+    MAD = np.where(has_data, close / MA5 * 100, np.nan)
+    IBS = np.where(has_data, (close - low) / (high - low + 1e-4), np.nan)
     return MAD, IBS
 
-def get_ranking(code_list, date: str, MAD_lower_limit=100, MAD_upper_limit=120):
+def get_ranking(code_list, date: str, daily_panel, MAD_lower_limit=100, MAD_upper_limit=120, panel_indicators=None):
     """
-    :param code_list: 후보군 리스트
+    :param code_list: 후보군 리스트 (None: daily panel 전체 종목)
     :param date: 기준 일자 (e.g. "20210602")
+    :param daily_panel: _DailyPanel
     :param MAD_lower_limit: MAD 하한 (e.g. 100)
     :param MAD_upper_limit: MAD 상한 (e.g. 120)
+    :param panel_indicators: _PanelIndicators (None: daily panel에서 직접 계산)
     :return:
     df
     ['종목 코드', 'MAD', 'IBS', 'MAD순위', 'IBS순위', '종합순위']]
@@ -78,16 +101,12 @@ def get_ranking(code_list, date: str, MAD_lower_limit=100, MAD_upper_limit=120):
     2) 조건1을 만족하는 리스트의 MAD 및 IBS 종합 순위 반환
     * MAD 값 클수록, IBS 작을수록 종합순위 1에 가까움
     """
-    c_list = []
-    m_list = []
-    i_list = []
-    for code in code_list:
-        MAD, IBS = get_MAD_and_IBS(code, date)
-        if MAD > MAD_lower_limit and MAD < MAD_upper_limit:
-            c_list.append(code)
-            m_list.append(MAD)
-            i_list.append(IBS)
-    data = {'종목 코드': c_list, 'MAD': m_list, 'IBS': i_list}
+    if code_list is None:
+        code_list = daily_panel.codes
+    MAD, IBS = get_MAD_and_IBS_array(code_list, date, daily_panel, panel_indicators)
+    with np.errstate(invalid='ignore'):
+        in_band = (MAD > MAD_lower_limit) & (MAD < MAD_upper_limit)
+    data = {'종목 코드': np.asarray(code_list, dtype=object)[in_band], 'MAD': MAD[in_band], 'IBS': IBS[in_band]}
     df = pd.DataFrame(data=data)
     df = df.set_index('종목 코드')
     df['MAD순위'] = df['MAD'].rank(ascending=False)
@@ -96,6 +115,111 @@ def get_ranking(code_list, date: str, MAD_lower_limit=100, MAD_upper_limit=120):
     df = df.sort_values(by='종합순위', ascending=True)
     return df
 
+def get_candidate_basket(yesterday, daily_panel, MAD_lower_limit, MAD_upper_limit, store_dir=None,
+                         liquidity_condition=None, volume_leaders=None, volume_top_n=100, panel_indicators=None,
+                         factor_store=None, ranking_formula=None):
+    """
+    :param yesterday: 기준 일자 (전 거래일)
+    :param daily_panel: _DailyPanel
+    :param MAD_lower_limit: MAD 하한
+    :param MAD_upper_limit: MAD 상한
+    :param store_dir: minute_store 경로
+    :param liquidity_condition: transaction_params['유동성 조건'][1] (None: 미 사용)
+    :param volume_leaders: _VolumeLeaders (None: 시장 스냅샷 조회 후 정렬)
+    :param volume_top_n: 거래량 상위 종목 수
+    :param panel_indicators: _PanelIndicators (일자 순서대로 호출 시 MA5를 새 bar로만 갱신)
+    :param factor_store: _FactorStore (ranking_formula 사용 시)
+    :param ranking_formula: [순위 산식, 후보 조건] (None: get_ranking 사용)
+    :return:
+    candidate_basket: 후보 종목 리스트 (우선순위 순)
+    * 전일 데이터에만 의존 (계좌 상태와 무관)
+    """
+    """
+    Volume Condition
+    """
+    if volume_leaders is not None:
+        volume_list = volume_leaders.get_leaders(yesterday, volume_top_n)
+    else:
+        temp1 = provider.get_market_ohlcv_by_ticker(yesterday, market="KOSPI")
+        temp2 = provider.get_market_ohlcv_by_ticker(yesterday, market='KOSDAQ')
+        all_df = pd.concat([temp1, temp2])
+        all_df = all_df.sort_values(by='거래량', ascending=False)
+        volume_list = all_df.index.to_list()[:volume_top_n]
+
+    """
+    Liquidity Condition
+    * 전일 분 단위 데이터 기준 거래량 부족 종목 제외 (minute_store 사용 시)
+    """
+    if liquidity_condition is not None and store_dir is not None:
+        volume_list = exclude_illiquid_stocks(yesterday, volume_list, store_dir, liquidity_condition)
+
+    """
+    Moving Average Distance & IBS Condition
+    * ranking_formula 사용 시 factor store에서 산식으로 순위 산출
+    """
+    if ranking_formula is not None:
+        formula, condition = ranking_formula
+        if condition is None:
+            condition = '(MAD5 > ' + str(MAD_lower_limit) + ') & (MAD5 < ' + str(MAD_upper_limit) + ')'
+        df = get_formula_ranking(factor_store, yesterday, code_list=volume_list, formula=formula, condition=condition)
+        return df.index.to_list()
+    df = get_ranking(code_list=volume_list, date=yesterday, daily_panel=daily_panel, MAD_lower_limit=MAD_lower_limit,
+                     MAD_upper_limit=MAD_upper_limit, panel_indicators=panel_indicators)
+    return df.index.to_list()
+
+"""
+_worker_candidate_params: basket worker process의 get_candidate_basket 인자 (_init_basket_worker에서 설정)
+"""
+_worker_candidate_params = None
+
+def _init_basket_worker(candidate_params, provider_params):
+    global _worker_candidate_params
+    # spawn 방식(Windows)에서는 provider 설정이 복사되지 않으므로 다시 설정
+    provider.configure(**provider_params)
+    _worker_candidate_params = candidate_params
+
+def _compute_basket(yesterday):
+    return get_candidate_basket(yesterday, **_worker_candidate_params)
+
+def compute_candidate_baskets(dates_list, candidate_params, provider_params, num_workers):
+    """
+    :param dates_list: 거래일 리스트
+    :param candidate_params: get_candidate_basket 인자
+    :param provider_params: provider.configure 인자 (cache_dir, replay_only, source)
+    :param num_workers: process 수
+    :return:
+    {매매 일자: candidate_basket} (dates_list[1:] 전체)
+    * candidate_basket은 계좌 상태와 무관 -> 전체 기간을 process pool에서 병렬 산출
+    * 각 process는 전 거래일 기준으로 독립 계산 (rolling 상태 미 사용, 동일 결과)
+    """
+    candidate_params = dict(candidate_params, panel_indicators=None)
+    chunksize = max(1, (len(dates_list) - 1) // (num_workers * 4))
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_basket_worker,
+                             initargs=(candidate_params, provider_params)) as executor:
+        baskets = list(executor.map(_compute_basket, dates_list[:-1], chunksize=chunksize))
+    return {dates_list[i + 1]: basket for i, basket in enumerate(baskets)}
+
+def _prefetch_day(today, yesterday, held_code_list, candidate_params, minute_params, prefetch_num,
+                  candidate_baskets=None):
+    """
+    :param today: 매매 일자
+    :param yesterday: 전 거래일
+    :param held_code_list: 사전 load 할 보유 종목 리스트 (prefetch 시점 기준)
+    :param candidate_params: get_candidate_basket 인자
+    :param minute_params: _MinuteSeries 인자 (data_dir, store_dir, availability, adjustment_factors)
+    :param prefetch_num: 사전 load 할 상위 후보 종목 수
+    :param candidate_baskets: compute_candidate_baskets 결과 (None: 직접 산출)
+    :return:
+    candidate_basket, _MinuteSeries (상위 후보 및 보유 종목 row load 완료)
+    """
+    if candidate_baskets is not None:
+        candidate_basket = candidate_baskets[today]
+    else:
+        candidate_basket = get_candidate_basket(yesterday, **candidate_params)
+    code_list = candidate_basket[:prefetch_num] + held_code_list
+    minute_series = _MinuteSeries(code_list, today, **minute_params).load_rows(code_list)
+    return candidate_basket, minute_series
+
 def simulation(**all_params):
     """
     :param all_params:
@@ -103,6 +227,8 @@ def simulation(**all_params):
     'strategy': '단타-이격도-최대20개',
     'stock_data_dir': 'C:/Git/Data/수정/minute_Data/',
     'ETF_data_dir': 'C:/Git/Data/수정/ETF_minute_Data/',
+    'stock_data_adjusted': True,
+    'ETF_data_adjusted': True,
     'start_date': '20210716',
     'end_date': '20210729',
     'MAD_lower_limit': 100,
@@ -112,6 +238,12 @@ def simulation(**all_params):
     'tax_rate': 0.003,
     'fee_rate': 0.000088,
     'is_stock': True,
+    'cache_dir': './cache/',
+    'replay_only': False,
+    'prefetch': True,
+    'basket_workers': 0,
+    'keep_in_memory': False,
+    'save_outputs': True,
     '매수 가격 기준': ['지정가', '전일 종가', '-1.5%'],
     '재 매수 허용': False,
     '목표가': '4.5%',
@@ -120,7 +252,9 @@ def simulation(**all_params):
     '종목 최대 보유일': [True, 3],
     '조건 부합 시 매도 가격 기준': ['지정가', '전일 종가', '-3%'],
     '보유일 만기 매도 가격 기준': ['지정가', '전일 종가', '-3%'],
+    '분봉 단위': 1,
     :return:
+    result_params (매매 결과)
     """
     """
     Params
@@ -137,36 +271,87 @@ def simulation(**all_params):
     tax_rate = all_params['tax_rate']
     fee_rate = all_params['fee_rate']
     is_stock = all_params['is_stock']
+    cache_dir = all_params.get('cache_dir', './cache/')
+    replay_only = all_params.get('replay_only', False)
+    adjustment_factor_file = all_params.get('adjustment_factor_file')
+    stock_data_adjusted = all_params.get('stock_data_adjusted', True)
+    ETF_data_adjusted = all_params.get('ETF_data_adjusted', False)
+    synthetic_market_dir = all_params.get('synthetic_market_dir')
+    keep_in_memory = all_params.get('keep_in_memory', False)
+    save_outputs = all_params.get('save_outputs', True)
+    prefetch = all_params.get('prefetch', False)
+    basket_workers = all_params.get('basket_workers', 0)
 
     data_dir = stock_data_dir if is_stock else ETF_data_dir
+    minute_data_adjusted = stock_data_adjusted if is_stock else ETF_data_adjusted
+    store_dir = all_params.get('stock_store_dir') if is_stock else all_params.get('ETF_store_dir')
+    use_liquidity_condition, liquidity_condition = all_params.get('유동성 조건', [False, {}])
+    use_ranking_formula, formula, condition = all_params.get('순위 산식', [False, None, None])
+    regime_condition = all_params.get('시장 국면 조건')
+    volume_top_n = all_params.get('거래량 상위 종목 수', 100)
+
+    """
+    Market Data Provider
+    * replay_only: 네트워크 호출 없이 캐시 데이터만 사용
+    * synthetic_market_dir: pykrx / FinanceDataReader 대신 합성 시장 데이터 사용 (synthetic_market.py)
+    * keep_in_memory: 호출 결과를 process memory에 유지 (backtest_server 등 반복 실행 시)
+    """
+    source = _SyntheticMarket.load(synthetic_market_dir) if synthetic_market_dir is not None else None
+    provider_params = {'cache_dir': cache_dir, 'replay_only': replay_only, 'source': source}
+    provider.configure(memory_cache=keep_in_memory, **provider_params)
 
     """
     Dates
     """
-    while True:
-        try:
-            dates_df = stock.get_index_ohlcv_by_date(start_date, end_date, "1001")
-            break
-        except json.decoder.JSONDecodeError:
-            pass
+    dates_df = provider.get_index_ohlcv_by_date(start_date, end_date, "1001")
     dates_list = dates_df.index.to_list()
     for i, date in enumerate(dates_list):
         dates_list[i] = datetime.strftime(date, "%Y%m%d")
 
     """
-    KOSDAQ
+    Market Regime
+    * 전체 기간 시장 국면 flag를 한 번만 계산 (dates_list 기준 array)
+    """
+    regime = compute_regime(dates_list, start_date, regime_condition)
+
+    """
+    Daily Panel
+    * 일자 x 종목 x OHLCV (기간 내 시장 스냅샷을 일자별로 한 번씩만 로드)
     """
     df_start_date = datetime.strftime(datetime.strptime(start_date, "%Y%m%d") - timedelta(days=20), "%Y%m%d")
-    df_start_date = stock.get_nearest_business_day_in_a_week(date=df_start_date, prev=True)
-    kosdaq_df = fdr.DataReader('KQ11', df_start_date)
-    kosdaq_df = kosdaq_df[['Close']]
-    kosdaq_df['MA3'] = kosdaq_df['Close'].rolling(window=3).mean()
-    kosdaq_df['MA5'] = kosdaq_df['Close'].rolling(window=5).mean()
-    kosdaq_df['MA10'] = kosdaq_df['Close'].rolling(window=10).mean()
-    new_index_list = []
-    for i in range(len(kosdaq_df)):
-        new_index_list.append(datetime.strftime(kosdaq_df.index[i], "%Y%m%d"))
-    kosdaq_df.index = new_index_list
+    df_start_date = provider.get_nearest_business_day_in_a_week(date=df_start_date, prev=True)
+    markets = ['KOSPI', 'KOSDAQ'] if is_stock else ['KOSPI', 'KOSDAQ', 'ETF']
+    daily_panel = load_daily_panel(df_start_date, end_date, markets=markets, cache_dir=cache_dir,
+                                   keep_in_memory=keep_in_memory)
+
+    """
+    Volume Leaders
+    * 일자별 KOSPI / KOSDAQ 거래량 상위 종목 table (무수정 daily panel 기준, 한 번만 계산)
+    """
+    stock_panel = daily_panel if is_stock else load_daily_panel(df_start_date, end_date, markets=['KOSPI', 'KOSDAQ'],
+                                                                cache_dir=cache_dir, keep_in_memory=keep_in_memory)
+    volume_leaders = load_volume_leaders(stock_panel, top_n=volume_top_n, cache_dir=cache_dir,
+                                         keep_in_memory=keep_in_memory)
+
+    """
+    수정주가 계수
+    * daily panel(무수정 스냅샷)과 분 단위 데이터를 같은 가격 기준으로 맞춤 (매수 / 매도 / 피벗 가격 비교 기준)
+    * adjustment_factor_file 지정 시: 무수정 분 단위 데이터용 계수 -> daily panel 및 분 단위 데이터 모두 변환
+      (stock_data_adjusted / ETF_data_adjusted 값과 무관)
+    * 미 지정 + 수정 분 단위 데이터: 기간 내 거래량 상위 종목(후보 / 보유 가능 종목)의 계수를 산출하여 daily panel만 변환
+      (종목별 비율은 cache_dir에 누적 저장 -> 새 종목 / 기간만 조회)
+    * 미 지정 + 무수정 분 단위 데이터: 변환 없음 (둘 다 무수정 기준)
+    """
+    minute_adjustment_factors = None
+    if adjustment_factor_file is not None:
+        daily_panel, minute_adjustment_factors = load_adjusted_panel(
+            daily_panel, adjustment_factor_file=adjustment_factor_file, cache_dir=cache_dir,
+            keep_in_memory=keep_in_memory)
+    elif minute_data_adjusted:
+        daily_panel, _ = load_adjusted_panel(daily_panel, volume_leaders.get_leader_codes(volume_top_n), df_start_date,
+                                             end_date, cache_dir=cache_dir, keep_in_memory=keep_in_memory)
+    all_params['daily_panel'] = daily_panel
+    all_params['adjustment_factors'] = minute_adjustment_factors
 
     """
     계좌 생성
@@ -197,23 +382,78 @@ def simulation(**all_params):
         'all_sold_stock_list': all_sold_stock_list,
     }
     result_dir = './results/'
-    if not os.path.isdir(result_dir):
-        os.mkdir(result_dir)
     strategy_dir = result_dir + strategy + '/'
-    if not os.path.isdir(strategy_dir):
-        os.mkdir(strategy_dir)
     graph_dir = strategy_dir + 'graphs/'
-    if not os.path.isdir(graph_dir):
-        os.mkdir(graph_dir)
     balance_dir = strategy_dir + 'balance/'
-    if not os.path.isdir(balance_dir):
-        os.mkdir(balance_dir)
+    if save_outputs:
+        for output_dir in [result_dir, strategy_dir, graph_dir, balance_dir]:
+            if not os.path.isdir(output_dir):
+                os.mkdir(output_dir)
+
+    """
+    Data Availability Index
+    * {종목 코드: 보유 일자 set}, 변경된 종목 폴더만 갱신
+    """
+    stock_availability = load_availability_index(stock_data_dir, cache_dir=cache_dir, keep_in_memory=keep_in_memory)
+    ETF_availability = load_availability_index(ETF_data_dir, cache_dir=cache_dir, keep_in_memory=keep_in_memory)
+    all_params['availability'] = stock_availability if is_stock else ETF_availability
 
     """
     Code List Update
     """
-    save_stock_code_list(stock_data_dir=stock_data_dir)
-    save_ETF_code_list(ETF_data_dir=ETF_data_dir)
+    try:
+        stock_code_list = save_stock_code_list(stock_availability=stock_availability)
+        ETF_code_list = save_ETF_code_list(ETF_availability=ETF_availability)
+    except CacheMissError:
+        # replay_only 모드: 오늘 기준 리스트가 캐시에 없는 경우 기존 리스트 사용
+        if not os.path.isfile('krx_codes.json') or not os.path.isfile('ETF_codes.json'):
+            raise
+        with open('krx_codes.json', 'r') as f:
+            stock_code_list = json.load(f)
+        with open('ETF_codes.json', 'r') as f:
+            ETF_code_list = json.load(f)
+    all_params['available_code_set'] = set(stock_code_list) | set(ETF_code_list)
+
+    """
+    Prefetch
+    * 매매일 i simulation 중 i+1 후보 종목 산출 및 분 데이터 load (background thread)
+    """
+    candidate_params = {
+        'daily_panel': daily_panel,
+        'MAD_lower_limit': MAD_lower_limit,
+        'MAD_upper_limit': MAD_upper_limit,
+        'store_dir': store_dir,
+        'liquidity_condition': liquidity_condition if use_liquidity_condition else None,
+        'volume_leaders': volume_leaders,
+        'volume_top_n': volume_top_n,
+        'panel_indicators': _PanelIndicators(daily_panel, windows=(5,)),
+        'factor_store': load_factor_store(daily_panel, cache_dir=cache_dir, keep_in_memory=keep_in_memory) if use_ranking_formula else None,
+        'ranking_formula': [formula, condition] if use_ranking_formula else None,
+    }
+    minute_params = {
+        'data_dir': data_dir,
+        'store_dir': store_dir,
+        'availability': all_params['availability'],
+        'adjustment_factors': minute_adjustment_factors,
+        'bar_size': all_params.get('분봉 단위', 1),
+    }
+
+    """
+    Candidate Baskets (2단계 실행)
+    * basket_workers > 0: 전체 기간 candidate_basket을 process pool에서 먼저 산출한 뒤 계좌 replay
+    """
+    candidate_baskets = None
+    if basket_workers > 0 and len(dates_list) > 1:
+        candidate_baskets = compute_candidate_baskets(dates_list, candidate_params, provider_params, basket_workers)
+        if save_outputs:
+            with open(strategy_dir + 'candidate_baskets.json', 'w') as f:
+                json.dump(candidate_baskets, f)
+
+    all_params['minute_series'] = None
+    if prefetch and len(dates_list) > 1:
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(_prefetch_day, dates_list[1], dates_list[0], balance.get_all_stock_code_list(),
+                                 candidate_params, minute_params, max_stock_num, candidate_baskets)
 
     """
     BackTesting
@@ -222,22 +462,18 @@ def simulation(**all_params):
         start_time = time.time()
         """
         전일 데이터 기반으로 후보 종목 리스트 산출
-        - Kosdaq Moving Average Condition
+        - Market Regime Condition
         - Volume Condition
+        - Liquidity Condition
         - Moving Average Distance & IBS Condition
         """
         yesterday = dates_list[i - 1]
         today = dates_list[i]
 
         """
-        Kosdaq Moving Average Condition
+        Market Regime Condition (기본: Kosdaq Moving Average Condition)
         """
-        buy_flag = False
-        if kosdaq_df.loc[yesterday]['Close'] >= kosdaq_df.loc[yesterday]['MA3'] or \
-                kosdaq_df.loc[yesterday]['Close'] >= kosdaq_df.loc[yesterday]['MA5'] or \
-                kosdaq_df.loc[yesterday]['Close'] >= kosdaq_df.loc[yesterday]['MA10']:
-            buy_flag = True
-        all_params['buy_flag'] = buy_flag
+        all_params['buy_flag'] = bool(regime.flags[i - 1])
 
         """
         청산 Condition
@@ -246,28 +482,20 @@ def simulation(**all_params):
 
         """
         Volume Condition
-        """
-        while True:
-            try:
-                temp1 = stock.get_market_ohlcv_by_ticker(yesterday, market="KOSPI")
-                temp2 = stock.get_market_ohlcv_by_ticker(yesterday, market='KOSDAQ')
-                break
-            except json.decoder.JSONDecodeError:
-                pass
-        all_df = pd.concat([temp1, temp2])
-        all_df = all_df.sort_values(by='거래량', ascending=False)
-        volume_list = all_df.index.to_list()[:100]
-
-        """
+        Liquidity Condition
         Moving Average Distance & IBS Condition
-        """
-        df = get_ranking(code_list=volume_list, date=yesterday, MAD_lower_limit=MAD_lower_limit,
-                         MAD_upper_limit=MAD_upper_limit)
-
-        """
         candidate_basket: 후보 종목 리스트 (우선순위 순)
+        * prefetch 사용 시 전 매매일 simulation 중 background에서 산출 및 분 데이터 load
         """
-        candidate_basket = df.index.to_list()
+        if prefetch:
+            candidate_basket, all_params['minute_series'] = future.result()
+            if i + 1 < len(dates_list):
+                future = executor.submit(_prefetch_day, dates_list[i + 1], today, balance.get_all_stock_code_list(),
+                                         candidate_params, minute_params, max_stock_num, candidate_baskets)
+        elif candidate_baskets is not None:
+            candidate_basket = candidate_baskets[today]
+        else:
+            candidate_basket = get_candidate_basket(yesterday, **candidate_params)
 
         """
         Day-to-Day Transaction
@@ -329,16 +557,22 @@ def simulation(**all_params):
         """
         계좌 정보
         """
-        _save_balance(today, day_stock_list, day_sold_stock_list, is_stock=is_stock, save_dir=balance_dir)
+        if save_outputs:
+            _save_balance(today, day_stock_list, day_sold_stock_list, is_stock=is_stock, save_dir=balance_dir)
 
         print(today + " Simulation 완료 [" + str(round(i/(len(dates_list)-1)*100, 2)) + "%]")
         print("* 소요 시간: " + str(round(time.time() - start_time, 2)) + "초")
 
 
+    if prefetch and len(dates_list) > 1:
+        executor.shutdown()
+
     """
     Generate Outputs
     """
-    _analyze_results(**result_params)
+    if save_outputs:
+        _analyze_results(**result_params)
+    return result_params
 
 
 
@@ -364,6 +598,12 @@ test_params = {
     'strategy': '단타-이격도-최대20개',
     'stock_data_dir': 'C:/Git/Data/수정/minute_Data/',
     'ETF_data_dir': 'C:/Git/Data/무수정/ETF_minute_Data/',
+    'stock_store_dir': None,
+    'ETF_store_dir': None,
+    'stock_data_adjusted': True,
+    'ETF_data_adjusted': False,
+    'adjustment_factor_file': None,
+    'synthetic_market_dir': None,
     'start_date': '20210701',
     'end_date': '20210731',
     'MAD_lower_limit': 100,
@@ -373,6 +613,12 @@ test_params = {
     'tax_rate': 0.003,
     'fee_rate': 0.000088,
     'is_stock': True,
+    'cache_dir': './cache/',
+    'replay_only': False,
+    'prefetch': True,
+    'basket_workers': 0,
+    'keep_in_memory': False,
+    'save_outputs': True,
 }
 """
 * TRANSACTION PARAMS *
@@ -386,6 +632,22 @@ test_params = {
 보유일 만기 매도 가격 기준 options:
 ['지정가', '전일 종가'/피벗 기준선'/'피벗 1차지지선'/'피벗 2차지지선'/'피벗 1차저항선'/'피벗 2차저항선', '-3%']
 ['당일 종가'/익일 시가']
+
+유동성 조건 options: (stock_store_dir / ETF_store_dir 사용 시 전일 분 단위 데이터 기준)
+[True/False, {'최소 거래 분 수': 300, '최대 거래량 0 비율': 0.3, '최소 분 거래량 중앙값': 10, '최소 시초 거래량': 100}]
+
+분봉 단위 options:
+1 (원본 분 단위), 3/5/10 (N분봉 screening 모드: 고가 / 저가로 매수 / 매도 조건 확인, 종가로 체결)
+* 최대 5분 체결 구간은 bar 수로 환산 (e.g. 5분봉: 1 bar, 3분봉: 2 bar)
+
+장중 지표 조건 options: (intraday_indicators.py의 INDICATOR_NAMES 및 MA{N} 사용, 매수: 기존 조건과 모두 만족, 매도: 조건 부합 시 매도 조건에 추가)
+[True/False, {'매수': '(가격 >= VWAP) & (수익률 < 3)', '매도': '가격 < MA20', '이동평균': [5, 20], '시가 범위': 30}]
+
+순위 산식 options: (factor_store.py의 FACTOR_COLUMNS 및 순위() 사용, 점수가 작을수록 우선)
+[True/False, '(순위(-MAD5) + 순위(IBS)) / 2', '(MAD5 > 100) & (MAD5 < 120)' (None: MAD_lower_limit ~ MAD_upper_limit)]
+
+시장 국면 조건 options: (regime.py, 전 거래일 장 종료 기준, 충족 규칙 수 >= 최소 충족 규칙 수 인 경우 매수)
+{'규칙': [['KQ11'/'KS11'/ETF 코드, '이동평균', 5], [지수, '이동평균 교차', 5, 20], [지수, '변동성', 20, 2.0]], '최소 충족 규칙 수': 1}
 """
 transaction_params = {
     '매수 가격 기준': ['지정가', '전일 종가', '-1.5%'],
@@ -397,6 +659,13 @@ transaction_params = {
     '조건 부합 시 매도 가격 기준': ['지정가', '피벗 기준선', '0%'],
     '보유일 만기 매도 가격 기준': ['지정가', '피벗 기준선', '0%'],
     # '보유일 만기 매도 가격 기준': ['익일 시가'],
+    '유동성 조건': [False, {'최소 거래 분 수': 300, '최대 거래량 0 비율': 0.3, '최소 분 거래량 중앙값': 10, '최소 시초 거래량': 100}],
+    '분봉 단위': 1,
+    '장중 지표 조건': [False, {'매수': '가격 >= VWAP', '매도': None, '이동평균': [5, 20], '시가 범위': 30}],
+    '순위 산식': [False, '(순위(-MAD5) + 순위(IBS)) / 2', None],
+    '시장 국면 조건': {'규칙': [['KQ11', '이동평균', 3], ['KQ11', '이동평균', 5], ['KQ11', '이동평균', 10]],
+                 '최소 충족 규칙 수': 1},
+    '거래량 상위 종목 수': 100,
 }
 all_params = test_params.copy()
 all_params.update(transaction_params)
@@ -404,5 +673,6 @@ all_params.update(transaction_params)
 """
 Execution
 """
-simulation(**all_params)
+if __name__ == '__main__':
+    simulation(**all_params)
 
@@ -0,0 +1,264 @@
+"""
+synthetic_market.py
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime
+import json
+import os
+from minute_store import TIMESTAMP
+
+"""
+MINUTE_JSON_SCHEMA: A{code}/{date}.json schema (pandas to_json(orient='table', index=False) 형식)
+"""
+MINUTE_JSON_SCHEMA = {'fields': [{'name': 'time', 'type': 'string'},
+                                 {'name': 'price', 'type': 'integer'},
+                                 {'name': 'volumes', 'type': 'integer'}],
+                      'pandas_version': '1.4.0'}
+_SCHEMA_JSON = json.dumps(MINUTE_JSON_SCHEMA, separators=(',', ':'))
+
+
+def get_tick_size(price):
+    """
+    :param price: 가격 array
+    :return:
+    호가 단위 array (KRX 주식 호가 가격 단위 기준)
+    """
+    bounds = [1000, 5000, 10000, 50000, 100000, 500000]
+    ticks = np.array([1, 5, 10, 50, 100, 500, 1000])
+    return ticks[np.searchsorted(bounds, price, side='right')]
+
+
+class _SyntheticMarket:
+    """
+    합성 시장 데이터 (일자 x 종목 x OHLCV, 지수)
+    * pykrx.stock / FinanceDataReader와 동일한 이름의 함수를 제공 -> provider.configure(source=...)로 사용
+    * 거래 정지 일자: 시가, 고가, 저가, 거래량 0 (pykrx와 동일)
+    """
+    name = 'synthetic'
+    COLUMNS = ['시가', '고가', '저가', '종가', '거래량']
+    INDEX_CODES = {'1001': 'KOSPI', 'KS11': 'KOSPI', '2001': 'KOSDAQ', 'KQ11': 'KOSDAQ'}
+
+    def __init__(self, dates, codes, code_markets, data, index_close):
+        """
+        :param dates: 거래일 리스트 (e.g. ['20210701', ...])
+        :param codes: 종목 코드 리스트
+        :param code_markets: 종목별 시장 리스트 ('KOSPI', 'KOSDAQ', 'ETF')
+        :param data: np.ndarray (len(dates), len(codes), len(COLUMNS))
+        :param index_close: {'KOSPI': 종가 array, 'KOSDAQ': 종가 array}
+        """
+        self.dates = list(dates)
+        self.codes = list(codes)
+        self.code_markets = list(code_markets)
+        self.data = data
+        self.index_close = index_close
+        self.date_idx = {date: i for i, date in enumerate(self.dates)}
+        self.code_idx = {code: i for i, code in enumerate(self.codes)}
+        self.datetime_index = pd.DatetimeIndex(pd.to_datetime(self.dates, format="%Y%m%d"), name='날짜')
+
+    @classmethod
+    def load(cls, market_dir):
+        npz = np.load(os.path.join(market_dir, 'daily.npz'))
+        index_close = {'KOSPI': npz['KOSPI'], 'KOSDAQ': npz['KOSDAQ']}
+        return cls(npz['dates'].tolist(), npz['codes'].tolist(), npz['code_markets'].tolist(), npz['data'],
+                   index_close)
+
+    def save(self, market_dir):
+        np.savez(os.path.join(market_dir, 'daily.npz'), dates=np.array(self.dates), codes=np.array(self.codes),
+                 code_markets=np.array(self.code_markets), data=self.data, KOSPI=self.index_close['KOSPI'],
+                 KOSDAQ=self.index_close['KOSDAQ'])
+
+    def _date_range(self, fromdate, todate):
+        fromdate = fromdate.replace('-', '') if fromdate is not None else self.dates[0]
+        todate = todate.replace('-', '') if todate is not None else self.dates[-1]
+        return [d for d, date in enumerate(self.dates) if fromdate <= date <= todate]
+
+    def _get_codes(self, market):
+        return [code for code, code_market in zip(self.codes, self.code_markets) if code_market == market]
+
+    def _snapshot(self, date, codes):
+        d = self.date_idx[date.replace('-', '')]
+        rows = [self.code_idx[code] for code in codes]
+        df = pd.DataFrame(self.data[d, rows], index=pd.Index(codes, name='티커'), columns=self.COLUMNS)
+        df = df.dropna()
+        df[self.COLUMNS] = df[self.COLUMNS].astype(np.int64)
+        df['거래대금'] = df['종가'] * df['거래량']
+        return df
+
+    """
+    pykrx.stock
+    """
+    def get_market_ohlcv_by_ticker(self, date, market='KOSPI'):
+        return self._snapshot(date, self._get_codes(market))
+
+    def get_etf_ohlcv_by_ticker(self, date):
+        return self._snapshot(date, self._get_codes('ETF'))
+
+    def get_market_ohlcv_by_date(self, fromdate, todate, ticker, adjusted=True):
+        d_list = self._date_range(fromdate, todate)
+        df = pd.DataFrame(self.data[d_list, self.code_idx[ticker]], index=self.datetime_index[d_list],
+                          columns=self.COLUMNS)
+        return df.dropna().astype(np.int64)
+
+    def get_index_ohlcv_by_date(self, fromdate, todate, ticker):
+        d_list = self._date_range(fromdate, todate)
+        close = self.index_close[self.INDEX_CODES[ticker]][d_list]
+        return pd.DataFrame({'시가': close, '고가': close, '저가': close, '종가': close, '거래량': 0},
+                            index=self.datetime_index[d_list])
+
+    def get_market_ticker_list(self, date=None, market='KOSPI'):
+        return self._get_codes(market)
+
+    def get_etf_ticker_list(self, date=None):
+        return self._get_codes('ETF')
+
+    def get_market_ticker_name(self, ticker):
+        return 'SYN' + ticker
+
+    def get_etf_ticker_name(self, ticker):
+        return 'SYN ETF' + ticker
+
+    def get_nearest_business_day_in_a_week(self, date=None, prev=True):
+        if prev:
+            candidates = [d for d in self.dates if d <= date]
+            return candidates[-1] if candidates else self.dates[0]
+        candidates = [d for d in self.dates if d >= date]
+        return candidates[0] if candidates else self.dates[-1]
+
+    """
+    FinanceDataReader
+    """
+    def DataReader(self, symbol, start=None, end=None):
+        d_list = self._date_range(start, end)
+        if symbol in self.INDEX_CODES:
+            close = self.index_close[self.INDEX_CODES[symbol]][d_list]
+            df = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 0},
+                              index=self.datetime_index[d_list])
+        else:
+            df = pd.DataFrame(self.data[d_list, self.code_idx[symbol]], index=self.datetime_index[d_list],
+                              columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        df['Change'] = df['Close'].pct_change()
+        return df
+
+
+def _write_minute_json(file_name, price, volume):
+    """
+    :param file_name: A{code}/{date}.json
+    :param price: 분 가격 array (TIMESTAMP 기준, 거래 없는 시각은 0)
+    :param volume: 분 거래량 array
+    :return:
+    거래가 있는 시각만 기록
+    """
+    traded = np.flatnonzero(volume > 0)
+    # json.dump 대비 빠른 직접 formatting (대량 생성용)
+    records = ','.join(['{"time":"%s","price":%d,"volumes":%d}' % (TIMESTAMP[t], p, v)
+                        for t, p, v in zip(traded, price[traded].tolist(), volume[traded].tolist())])
+    with open(file_name, 'w') as f:
+        f.write('{"schema":' + _SCHEMA_JSON + ',"data":[' + records + ']}')
+
+
+def _generate_code(rng, n_days, is_illiquid, is_ETF):
+    """
+    :param rng: np.random.Generator
+    :param n_days: 거래일 수
+    :param is_illiquid: 저유동성 종목 여부 (분 단위 거래 희소)
+    :param is_ETF: ETF 여부 (낮은 변동성)
+    :return:
+    분 가격 matrix, 분 거래량 matrix (거래일 수 x len(TIMESTAMP)), 상장 후 첫 거래일 idx
+    """
+    n_minutes = len(TIMESTAMP)
+    daily_vol = rng.uniform(0.005, 0.012) if is_ETF else rng.uniform(0.015, 0.05)
+    base_price = np.exp(rng.uniform(np.log(2000), np.log(50000))) if is_ETF \
+        else np.exp(rng.uniform(np.log(500), np.log(300000)))
+    trade_prob = rng.uniform(0.02, 0.3) if is_illiquid else rng.uniform(0.7, 0.99)
+    volume_scale = rng.lognormal(2, 1) if is_illiquid else rng.lognormal(6, 1.5)
+    # 신규 상장 (기간 중 일부 종목)
+    listing_idx = int(rng.integers(1, n_days)) if rng.random() < 0.05 and n_days > 1 else 0
+
+    # 장 중 변동성: 장 초반 / 후반에 높은 U자 형태
+    intraday = 1 + 1.5 * np.exp(-np.arange(n_minutes) / 20) + 0.5 * np.exp((np.arange(n_minutes) - n_minutes) / 20)
+    minute_vol = daily_vol / np.sqrt(n_minutes) * intraday / np.sqrt(np.mean(intraday ** 2))
+    gaps = rng.normal(0, daily_vol / 3, n_days)
+    returns = rng.standard_normal((n_days, n_minutes)) * minute_vol
+    returns[:, 0] += gaps
+    log_price = np.log(base_price) + np.cumsum(returns.ravel()).reshape(n_days, n_minutes)
+    raw_price = np.exp(log_price)
+    price = (np.round(raw_price / get_tick_size(raw_price)) * get_tick_size(raw_price)).astype(np.int64)
+
+    traded = rng.random((n_days, n_minutes)) < trade_prob * intraday / intraday.max() * 1.5
+    traded[:, -1] |= not is_illiquid
+    volume = np.ceil(rng.lognormal(0, 1, (n_days, n_minutes)) * volume_scale * intraday).astype(np.int64)
+    volume[~traded] = 0
+    # 거래 정지 일자
+    volume[rng.random(n_days) < 0.003] = 0
+    volume[:listing_idx] = 0
+    price[volume == 0] = 0
+    return price, volume, listing_idx
+
+
+def generate_synthetic_market(market_dir, start_date, end_date, num_KOSPI=800, num_KOSDAQ=1200, num_ETF=300,
+                              illiquid_ratio=0.3, seed=0):
+    """
+    :param market_dir: 저장 경로
+    :param start_date: 시작 일자 (지표 계산용 과거 구간 포함, e.g. '20190601')
+    :param end_date: 종료 일자 (e.g. '20210731')
+    :param num_KOSPI: KOSPI 종목 수
+    :param num_KOSDAQ: KOSDAQ 종목 수
+    :param num_ETF: ETF 종목 수
+    :param illiquid_ratio: 저유동성 종목 비율
+    :param seed: random seed (동일 seed -> 동일 데이터)
+    :return:
+    _SyntheticMarket
+    market_dir/stock/A{code}/{date}.json: 주식 분 단위 데이터 (stock_data_dir)
+    market_dir/ETF/A{code}/{date}.json: ETF 분 단위 데이터 (ETF_data_dir)
+    market_dir/daily.npz: 분 단위 데이터에서 집계한 일 단위 OHLCV 및 지수 (provider source)
+    * 주말 제외 영업일 기준 (공휴일 미 반영)
+    """
+    dates = [datetime.strftime(date, "%Y%m%d") for date in pd.bdate_range(start_date, end_date)]
+    codes = ['%06d' % (100000 + i) for i in range(num_KOSPI)] + \
+            ['%06d' % (200000 + i) for i in range(num_KOSDAQ)] + \
+            ['%06d' % (300000 + i) for i in range(num_ETF)]
+    code_markets = ['KOSPI'] * num_KOSPI + ['KOSDAQ'] * num_KOSDAQ + ['ETF'] * num_ETF
+    data = np.full((len(dates), len(codes), len(_SyntheticMarket.COLUMNS)), np.nan)
+    code_seeds = np.random.SeedSequence(seed).spawn(len(codes))
+
+    for c, (code, market) in enumerate(zip(codes, code_markets)):
+        rng = np.random.default_rng(code_seeds[c])
+        is_ETF = market == 'ETF'
+        price, volume, listing_idx = _generate_code(rng, len(dates), rng.random() < illiquid_ratio, is_ETF)
+
+        code_dir = os.path.join(market_dir, 'ETF' if is_ETF else 'stock', 'A' + code)
+        if not os.path.isdir(code_dir):
+            os.makedirs(code_dir)
+        prev_close = np.nan
+        for d in range(listing_idx, len(dates)):
+            traded = np.flatnonzero(volume[d] > 0)
+            if len(traded) == 0:
+                # 거래 정지: 시가, 고가, 저가, 거래량 0, 종가는 전일 종가
+                data[d, c] = [0, 0, 0, prev_close, 0]
+                continue
+            _write_minute_json(os.path.join(code_dir, dates[d] + '.json'), price[d], volume[d])
+            day_price = price[d, traded]
+            prev_close = day_price[-1]
+            data[d, c] = [day_price[0], day_price.max(), day_price.min(), prev_close, volume[d].sum()]
+        # 상장 첫날 이전 거래 정지 종가 보정
+        data[listing_idx:, c, 3] = pd.Series(data[listing_idx:, c, 3]).bfill().to_numpy()
+
+    index_close = {}
+    for market in ['KOSPI', 'KOSDAQ']:
+        close = data[:, [c for c, code_market in enumerate(code_markets) if code_market == market], 3]
+        log_return = np.nanmean(np.diff(np.log(close), axis=0), axis=1)
+        index_close[market] = 1000 * np.exp(np.concatenate([[0], np.nan_to_num(log_return)]))
+
+    synthetic_market = _SyntheticMarket(dates, codes, code_markets, data, index_close)
+    synthetic_market.save(market_dir)
+    return synthetic_market
+
+
+if __name__ == '__main__':
+    """
+    Usage: python synthetic_market.py <market_dir> <start_date> <end_date> [num_KOSPI num_KOSDAQ num_ETF]
+    """
+    import sys
+    num_list = [int(num) for num in sys.argv[4:7]]
+    generate_synthetic_market(sys.argv[1], sys.argv[2], sys.argv[3], *num_list)
@@ -0,0 +1,34 @@
+"""
+test_factor_store.py
+"""
+import numpy as np
+from daily_panel import _DailyPanel
+from factor_store import load_factor_store, get_formula_ranking, DEFAULT_FORMULA
+from simulation import get_ranking
+
+
+def test_default_formula_matches_get_ranking(synthetic_panel, tmp_path):
+    factor_store = load_factor_store(synthetic_panel, cache_dir=str(tmp_path) + '/')
+    code_list = synthetic_panel.codes[::-1] + ['999999']
+    num_ranked = 0
+    for date in synthetic_panel.dates[4:]:
+        expected = get_ranking(code_list, date, synthetic_panel, MAD_lower_limit=100, MAD_upper_limit=120)
+        df = get_formula_ranking(factor_store, date, code_list=code_list, formula=DEFAULT_FORMULA,
+                                 condition='(MAD5 > 100) & (MAD5 < 120)')
+        assert df.index.to_list() == expected.index.to_list(), date
+        np.testing.assert_array_equal(df['MAD5'].to_numpy(), expected['MAD'].to_numpy())
+        np.testing.assert_array_equal(df['점수'].to_numpy(), expected['종합순위'].to_numpy())
+        num_ranked += len(df)
+    assert num_ranked > 0
+
+
+def test_factor_store_follows_panel_values(synthetic_panel, tmp_path):
+    cache_dir = str(tmp_path) + '/'
+    factor_store = load_factor_store(synthetic_panel, cache_dir=cache_dir)
+    # 같은 기간 / 종목이라도 panel 값이 다르면(e.g. 수정주가 변환) 다시 계산
+    adjusted_panel = _DailyPanel(synthetic_panel.dates, synthetic_panel.codes, synthetic_panel.data * 0.5)
+    adjusted_store = load_factor_store(adjusted_panel, cache_dir=cache_dir)
+    pivot_idx = factor_store.column_idx['피벗']
+    np.testing.assert_allclose(adjusted_store.data[:, :, pivot_idx], factor_store.data[:, :, pivot_idx] * 0.5)
+    # 동일 panel 재 호출 시 저장된 factor 사용
+    np.testing.assert_array_equal(load_factor_store(synthetic_panel, cache_dir=cache_dir).data, factor_store.data)
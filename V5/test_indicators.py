@@ -0,0 +1,42 @@
+"""
+test_indicators.py
+"""
+import numpy as np
+from daily_panel import _DailyPanel
+from indicators import _PanelIndicators
+from simulation import get_MAD_and_IBS_array
+
+
+def _scale_panel(daily_panel, factor):
+    """
+    :return:
+    가격에 factor를 곱한 _DailyPanel (수정주가처럼 정수가 아닌 가격 -> 합산 순서에 따라 끝자리 차이 발생)
+    """
+    data = daily_panel.data.copy()
+    for column in ['시가', '고가', '저가', '종가']:
+        data[:, :, daily_panel.column_idx[column]] *= factor
+    return _DailyPanel(daily_panel.dates, daily_panel.codes, data)
+
+
+def test_panel_moving_average_matches_direct_mean(synthetic_panel):
+    daily_panel = _scale_panel(synthetic_panel, 0.37)
+    panel_indicators = _PanelIndicators(daily_panel, windows=(3, 5, 10))
+    close = daily_panel.data[:, :, daily_panel.column_idx['종가']]
+    for d, date in enumerate(daily_panel.dates):
+        panel_indicators.advance_to(date)
+        for window in (3, 5, 10):
+            expected = close[d - window + 1:d + 1].mean(axis=0) if d >= window - 1 else np.full(close.shape[1], np.nan)
+            # bit 단위 동일 (NaN 위치 포함)
+            np.testing.assert_array_equal(panel_indicators.get_moving_average(window), expected)
+
+
+def test_rolling_MAD_matches_direct(synthetic_panel):
+    daily_panel = _scale_panel(synthetic_panel, 0.37)
+    panel_indicators = _PanelIndicators(daily_panel, windows=(5,))
+    code_list = daily_panel.codes + ['999999']
+    # 중간 일자부터 시작 (앞선 일자는 advance_to에서 차례로 반영)
+    for date in daily_panel.dates[10::3]:
+        MAD, IBS = get_MAD_and_IBS_array(code_list, date, daily_panel, panel_indicators)
+        expected_MAD, expected_IBS = get_MAD_and_IBS_array(code_list, date, daily_panel)
+        np.testing.assert_array_equal(MAD, expected_MAD)
+        np.testing.assert_array_equal(IBS, expected_IBS)
@@ -0,0 +1,47 @@
+"""
+test_simulation.py
+"""
+import numpy as np
+import pandas as pd
+from simulation import get_ranking
+
+
+def _get_ranking_per_code(code_list, date, daily_panel, MAD_lower_limit=100, MAD_upper_limit=120):
+    """
+    vectorize 이전 get_ranking (종목별 MAD / IBS 계산, 기준 구현)
+    """
+    c_list = []
+    m_list = []
+    i_list = []
+    for code in code_list:
+        close_list = np.array([daily_panel.get_value(code, date, '종가', offset) for offset in range(-4, 1)])
+        MA5 = close_list.mean()
+        close = daily_panel.get_value(code, date, '종가')
+        high = daily_panel.get_value(code, date, '고가')
+        low = daily_panel.get_value(code, date, '저가')
+        MAD = close / MA5 * 100
+        IBS = (close - low) / (high - low + 1e-4)
+        if MAD > MAD_lower_limit and MAD < MAD_upper_limit:
+            c_list.append(code)
+            m_list.append(MAD)
+            i_list.append(IBS)
+    data = {'종목 코드': c_list, 'MAD': m_list, 'IBS': i_list}
+    df = pd.DataFrame(data=data)
+    df = df.set_index('종목 코드')
+    df['MAD순위'] = df['MAD'].rank(ascending=False)
+    df['IBS순위'] = df['IBS'].rank(ascending=True)
+    df['종합순위'] = (df['MAD순위'] + df['IBS순위']) / 2
+    df = df.sort_values(by='종합순위', ascending=True)
+    return df
+
+
+def test_get_ranking_matches_per_code(synthetic_panel):
+    # panel에 없는 종목 포함
+    code_list = synthetic_panel.codes[::-1] + ['999999']
+    num_ranked = 0
+    for date in synthetic_panel.dates[4:]:
+        expected = _get_ranking_per_code(code_list, date, synthetic_panel)
+        df = get_ranking(code_list, date, synthetic_panel)
+        pd.testing.assert_frame_equal(df, expected, check_exact=True, check_index_type=False)
+        num_ranked += len(df)
+    assert num_ranked > 0
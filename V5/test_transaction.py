@@ -0,0 +1,531 @@
+"""
+test_transaction.py
+"""
+import copy
+import pytest
+import simulation
+from transaction import _transaction, FILL_MINUTES, _MinuteSeries, exclude_no_data_stocks, \
+    exclude_suspended_stocks, get_price_levels, get_win_lose_price, get_price_volumes
+from intraday_indicators import compute_intraday_indicators
+
+
+"""
+event 매매 엔진(_transaction) 차등 테스트
+* 기존 분 단위 루프(_per_minute_transaction)와 같은 합성 시장 / parameter로 simulation 후 일자별 거래 내역 비교
+"""
+
+
+def _get_price_range(minute_series, time_idx, code):
+    row = minute_series.get_row(code)
+    if row is None:
+        return 0, 0
+    if minute_series.bar_size == 1:
+        price = minute_series.price_matrix[row, time_idx]
+        return price, price
+    return minute_series.low_matrix[row, time_idx], minute_series.high_matrix[row, time_idx]
+
+
+def _per_minute_transaction(date, candidate_code_list, balance, **transaction_params):
+    """
+    event 엔진 이전 _transaction (매 분 전체 후보 / 보유 종목 확인, 기준 구현)
+    """
+    stock_data_dir = transaction_params['stock_data_dir']
+    ETF_data_dir = transaction_params['ETF_data_dir']
+    purchase_param_list = transaction_params['매수 가격 기준']
+    allow_repurchase = transaction_params['재 매수 허용']
+    target_margin = transaction_params['목표가']
+    use_stop_loss = transaction_params['손절가'][0]
+    loss_margin = transaction_params['손절가'][1]
+    use_min_hold = transaction_params['종목 최소 보유일'][0]
+    min_hold = transaction_params['종목 최소 보유일'][1]
+    use_maturity = transaction_params['종목 최대 보유일'][0]
+    maturity = transaction_params['종목 최대 보유일'][1]
+    sell_param_list = transaction_params['조건 부합 시 매도 가격 기준']
+    sell_param_list_after_maturity = transaction_params['보유일 만기 매도 가격 기준']
+    tax_rate = transaction_params['tax_rate']
+    fee_rate = transaction_params['fee_rate']
+    buy_flag = transaction_params['buy_flag']
+    sell_all_flag = transaction_params['sell_all_flag']
+    is_stock = transaction_params['is_stock']
+    daily_panel = transaction_params['daily_panel']
+    available_code_set = transaction_params['available_code_set']
+    availability = transaction_params.get('availability')
+    adjustment_factors = transaction_params.get('adjustment_factors')
+    bar_size = transaction_params.get('분봉 단위', 1)
+    use_intraday_condition, intraday_condition = transaction_params.get('장중 지표 조건', [False, {}])
+
+    data_dir = stock_data_dir if is_stock else ETF_data_dir
+    store_dir = transaction_params.get('stock_store_dir') if is_stock else transaction_params.get('ETF_store_dir')
+    # 최대 체결 구간 bar 수 (원본 분 단위: 5)
+    fill_bars = -(-FILL_MINUTES // bar_size)
+
+    """
+    데이터 미 보유 종목 제외
+    """
+    candidate_code_list = exclude_no_data_stocks(candidate_code_list, available_code_set)
+    
+    """
+    거래 정지 종목 제외 (전날 or 당일 거래 정지 종목)
+    """
+    candidate_code_list = exclude_suspended_stocks(date, candidate_code_list, daily_panel)
+    stock_code_list = exclude_suspended_stocks(date, balance.get_all_stock_code_list(), daily_panel)
+
+    """
+    재 매수 방지 option
+    * 만기 사용 시 재 매수 금지
+    """
+    if not allow_repurchase or use_maturity:
+        candidate_code_list = [code for code in candidate_code_list if code not in stock_code_list]
+
+    """
+    Load 매매일 분 데이터
+    timestamp
+    ['0901', '0902', ..., '1520', '1530']
+    minute_series
+    _MinuteSeries (종목 수 x len(timestamp) 가격, 거래량)
+    * 후보 종목 데이터는 매수 루프에서 처음 조회될 때 load
+    * 분봉 단위 N > 1: N분봉(고가 / 저가로 조건 확인, 종가로 체결) 기준 매매 (screening 용 근사)
+    """
+    candidate_and_stock_code_list = candidate_code_list + stock_code_list
+    minute_series = _MinuteSeries(candidate_and_stock_code_list, date, data_dir, store_dir, availability,
+                                  adjustment_factors, bar_size)
+    prefetched_minute_series = transaction_params.get('minute_series')
+    if prefetched_minute_series is not None and prefetched_minute_series.date == date and \
+            prefetched_minute_series.bar_size == bar_size:
+        # simulation prefetch 단계에서 미리 load한 데이터 사용
+        minute_series.take_loaded_rows(prefetched_minute_series)
+    timestamp = minute_series.timestamp
+
+    """
+    매매일 가격 기준 (매수 가격, 매도 가격, 피벗)
+    * 일자 및 종목에만 의존하므로 분 단위 매매 이전 1회 계산
+    position_levels: 보유 종목별 목표가, 손절가 {(코드, 매입날짜): (목표가, 손절가)}
+    """
+    price_levels = get_price_levels(date, candidate_and_stock_code_list, daily_panel, purchase_param_list,
+                                    sell_param_list, sell_param_list_after_maturity)
+    target_rate = 1 + float(target_margin[:-1])/100
+    lose_rate = 1 + float(loss_margin[:-1])/100 if use_stop_loss else 0
+    position_levels = {}
+
+    """
+    장중 지표 조건 (VWAP, 누적 거래량, 분 이동평균, 시가 범위, 당일 수익률)
+    * 사용 시 전체 종목 분 데이터를 load 후 지표를 한 번에 계산하여 매수 / 매도 조건 mask 산출
+    intraday_buy_mask: 매수 조건에 추가 (모두 만족 시 매수)
+    intraday_sell_mask: 조건 부합 시 매도 조건에 추가 (하나라도 만족 시 매도)
+    종목 수 x len(timestamp) bool, None: 미 사용
+    """
+    intraday_buy_mask = None
+    intraday_sell_mask = None
+    if use_intraday_condition:
+        intraday_indicators = compute_intraday_indicators(minute_series.load_all(),
+                                                          ma_windows=intraday_condition.get('이동평균', [5, 20]),
+                                                          opening_range=intraday_condition.get('시가 범위', 30))
+        if intraday_condition.get('매수') is not None:
+            intraday_buy_mask = intraday_indicators.evaluate(intraday_condition['매수'])
+        if intraday_condition.get('매도') is not None:
+            intraday_sell_mask = intraday_indicators.evaluate(intraday_condition['매도'])
+
+    """
+    청산 Condition
+    """
+    if sell_all_flag:
+        stock_list = balance.get_all_stock_list()
+        for stock in stock_list:
+            quantity = stock['수량']
+            # 최대 5분간 매도
+            for time_idx in range(fill_bars):
+                price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                # 거래 없는 경우
+                if price == 0 or volumes == 0:
+                    continue
+                # 거래량 충분한 경우:
+                if volumes >= quantity:
+                    balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                       sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+                    break
+                # 거래량 부족한 경우:
+                else:
+                    balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                       sell_price=price, sell_quantity=volumes, is_stock=is_stock)
+                    quantity -= volumes
+            if quantity != 0:
+                balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                   sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+
+    """
+    보유일 만기 매도 가격 기준 option = '익일 시가'
+    """
+    if use_maturity and sell_param_list_after_maturity[0] == '익일 시가':
+        stock_list = balance.get_all_stock_list()
+        for stock in stock_list:
+            if stock['보유일수'] >= maturity:
+                quantity = stock['수량']
+                # 최대 5분간 매도
+                for time_idx in range(fill_bars):
+                    price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                    # 거래 없는 경우
+                    if price == 0 or volumes == 0:
+                        continue
+                    # 거래량 충분한 경우:
+                    if volumes >= quantity:
+                        balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                           sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+                        break
+                    # 거래량 부족한 경우:
+                    else:
+                        balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                           sell_price=price, sell_quantity=volumes, is_stock=is_stock)
+                        quantity -= volumes
+                if quantity != 0:
+                    balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                       sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+
+    """
+    분 단위 매매 시뮬레이션
+    """
+    today_bought_code_list = []
+    for time_idx in range(len(timestamp)):
+        # 매수
+        if buy_flag and balance.stock_num < balance.max_stock_num:
+            for code in candidate_code_list:
+                if code not in today_bought_code_list:
+                    target_purchase_price = price_levels[code]['매수 가격']
+                    target_sell_price = price_levels[code]['조건 부합 시 매도 가격']
+                    price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=code)
+                    # 거래 없는 경우
+                    if price == 0 or volumes == 0:
+                        continue
+                    low, high = _get_price_range(minute_series=minute_series, time_idx=time_idx, code=code)
+                    # 장중 지표 조건
+                    if intraday_buy_mask is not None and not intraday_buy_mask[minute_series.code_idx[code], time_idx]:
+                        continue
+                    # 매수 조건 만족 시
+                    # {매수 시점 가격 >= 조건 부합 시 매도 가격}인 경우 매수 방지 -> 매수 시점에 매도 조건을 만족하는 모순
+                    # {매수 가격 <= 조건 부합 시 매도 가격 * (1 - fee_rate - tax_rate) / (1 + fee_rate)}인 경우 매수 -> 매도 가격이 손익 분기 넘도록
+                    if low <= target_purchase_price and not low >= target_sell_price:
+                        break_even_price = target_sell_price * (1 - fee_rate - tax_rate) / (1 + fee_rate) \
+                            if is_stock else target_sell_price * (1 - fee_rate) / (1 + fee_rate)
+                        if low <= break_even_price:
+                            quantity = (balance.get_asset() / balance.max_stock_num) // price
+                            # 최대 5분간 매수
+                            bought = False
+                            for p_time_idx in range(time_idx, min(time_idx+fill_bars, len(timestamp)-1)):
+                                price, volumes = get_price_volumes(minute_series=minute_series, time_idx=p_time_idx, code=code)
+                                # 거래 없는 경우
+                                if price == 0 or volumes == 0:
+                                    continue
+                                bought = True
+                                # 거래량 충분한 경우
+                                if volumes >= quantity:
+                                    balance.purchase_stock(date=date, time=timestamp[p_time_idx], code=code,
+                                                           price=price, quantity=quantity, is_stock=is_stock)
+                                    break
+                                # 거래량 부족한 경우
+                                else:
+                                    balance.purchase_stock(date=date, time=timestamp[p_time_idx], code=code,
+                                                           price=price, quantity=volumes, is_stock=is_stock)
+                                    quantity -= volumes
+                            # 당일 재매수 금지
+                            if bought:
+                                today_bought_code_list.append(code)
+                if balance.stock_num >= balance.max_stock_num:
+                    break
+
+        # 매도
+        stock_list = balance.get_all_stock_list()
+        for stock in stock_list:
+            # 최소 보유일
+            if use_min_hold:
+                if stock['보유일수'] < min_hold:
+                    continue
+            # 목표가, 손절가
+            position_key = (stock['코드'], stock['날짜'])
+            if position_key not in position_levels:
+                position_levels[position_key] = get_win_lose_price(stock['매입가'], target_rate, lose_rate)
+            win_price, lose_price = position_levels[position_key]
+            # 만기 옵션 O
+            if use_maturity:
+                # 만기 이전
+                if stock['보유일수'] < maturity:
+                    price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                    # 거래 없는 경우
+                    if price == 0 or volumes == 0:
+                        continue
+                    low, high = _get_price_range(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                    # 익절/손절
+                    if high >= win_price or low <= lose_price:
+                        quantity = stock['수량']
+                        # 최대 5분간 매도
+                        for s_time_idx in range(time_idx, min(time_idx+fill_bars, len(timestamp)-1)):
+                            price, volumes = get_price_volumes(minute_series=minute_series, time_idx=s_time_idx, code=stock['코드'])
+                            # 거래 없는 경우
+                            if price == 0 or volumes == 0:
+                                continue
+                            # 거래량 충분한 경우
+                            if volumes >= quantity:
+                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                                   sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+                                break
+                            # 거래량 부족한 경우
+                            else:
+                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                                   sell_price=price, sell_quantity=volumes, is_stock=is_stock)
+                                quantity -= volumes
+                        if quantity != 0:
+                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                               sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+                        continue
+
+                    # 조건 부합 시 매도 가격 기준
+                    target_sell_price = price_levels[stock['코드']]['조건 부합 시 매도 가격']
+                    intraday_sell = intraday_sell_mask is not None and \
+                        intraday_sell_mask[minute_series.code_idx[stock['코드']], time_idx]
+                    if high >= target_sell_price or intraday_sell:
+                        quantity = stock['수량']
+                        # 최대 5분간 매도
+                        for s_time_idx in range(time_idx, min(time_idx+fill_bars, len(timestamp)-1)):
+                            price, volumes = get_price_volumes(minute_series=minute_series, time_idx=s_time_idx, code=stock['코드'])
+                            # 거래 없는 경우
+                            if price == 0 or volumes == 0:
+                                continue
+                            # 거래량 충분한 경우
+                            if volumes >= quantity:
+                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
+                                                   sell_quantity=quantity, is_stock=is_stock)
+                                break
+                            # 거래량 부족한 경우
+                            else:
+                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
+                                                   sell_quantity=volumes, is_stock=is_stock)
+                                quantity -= volumes
+                        if quantity != 0:
+                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
+                                               sell_quantity=quantity, is_stock=is_stock)
+
+                # 만기 이후
+                else:
+                    price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                    # 거래 없는 경우
+                    if price == 0 or volumes == 0:
+                        continue
+                    low, high = _get_price_range(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                    # 익절/손절
+                    if high >= win_price or low <= lose_price:
+                        quantity = stock['수량']
+                        # 최대 5분간 매도
+                        for s_time_idx in range(time_idx, min(time_idx+fill_bars, len(timestamp)-1)):
+                            price, volumes = get_price_volumes(minute_series=minute_series, time_idx=s_time_idx, code=stock['코드'])
+                            # 거래 없는 경우
+                            if price == 0 or volumes == 0:
+                                continue
+                            # 거래량 충분한 경우
+                            if volumes >= quantity:
+                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
+                                                   sell_quantity=quantity, is_stock=is_stock)
+                                break
+                            # 거래량 부족한 경우
+                            else:
+                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
+                                                   sell_quantity=volumes, is_stock=is_stock)
+                                quantity -= volumes
+                        if quantity != 0:
+                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
+                                               sell_quantity=quantity, is_stock=is_stock)
+                        continue
+
+                    # 보유일 만기 매도 가격 기준
+                    if sell_param_list_after_maturity[0] == '지정가':
+                        target_sell_price = price_levels[stock['코드']]['보유일 만기 매도 가격']
+                        if high >= target_sell_price:
+                            quantity = stock['수량']
+                            # 최대 5분간 매도
+                            for s_time_idx in range(time_idx, min(time_idx + fill_bars, len(timestamp) - 1)):
+                                price, volumes = get_price_volumes(minute_series=minute_series, time_idx=s_time_idx,
+                                                                   code=stock['코드'])
+                                # 거래 없는 경우
+                                if price == 0 or volumes == 0:
+                                    continue
+                                # 거래량 충분한 경우
+                                if volumes >= quantity:
+                                    balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                                       sell_price=price,
+                                                       sell_quantity=quantity, is_stock=is_stock)
+                                    break
+                                # 거래량 부족한 경우
+                                else:
+                                    balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                                       sell_price=price,
+                                                       sell_quantity=volumes, is_stock=is_stock)
+                                    quantity -= volumes
+                            if quantity != 0:
+                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                                   sell_price=price,
+                                                   sell_quantity=quantity, is_stock=is_stock)
+
+            # 만기 옵션 X
+            else:
+                price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                # 거래 없는 경우
+                if price == 0 or volumes == 0:
+                    continue
+                low, high = _get_price_range(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                # 익절/손절
+                if high >= win_price or low <= lose_price:
+                    quantity = stock['수량']
+                    # 최대 5분간 매도
+                    for s_time_idx in range(time_idx, min(time_idx + fill_bars, len(timestamp) - 1)):
+                        price, volumes = get_price_volumes(minute_series=minute_series, time_idx=s_time_idx,
+                                                           code=stock['코드'])
+                        # 거래 없는 경우
+                        if price == 0 or volumes == 0:
+                            continue
+                        # 거래량 충분한 경우
+                        if volumes >= quantity:
+                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                               sell_price=price,
+                                               sell_quantity=quantity, is_stock=is_stock)
+                            break
+                        # 거래량 부족한 경우
+                        else:
+                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                               sell_price=price,
+                                               sell_quantity=volumes, is_stock=is_stock)
+                            quantity -= volumes
+                    if quantity != 0:
+                        balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                           sell_price=price,
+                                           sell_quantity=quantity, is_stock=is_stock)
+                    continue
+
+                # 조건 부합 시 매도 가격 기준
+                target_sell_price = price_levels[stock['코드']]['조건 부합 시 매도 가격']
+                intraday_sell = intraday_sell_mask is not None and \
+                    intraday_sell_mask[minute_series.code_idx[stock['코드']], time_idx]
+                if high >= target_sell_price or intraday_sell:
+                    quantity = stock['수량']
+                    # 최대 5분간 매도
+                    for s_time_idx in range(time_idx, min(time_idx + fill_bars, len(timestamp) - 1)):
+                        price, volumes = get_price_volumes(minute_series=minute_series, time_idx=s_time_idx,
+                                                           code=stock['코드'])
+                        # 거래 없는 경우
+                        if price == 0 or volumes == 0:
+                            continue
+                        # 거래량 충분한 경우
+                        if volumes >= quantity:
+                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                               sell_price=price,
+                                               sell_quantity=quantity, is_stock=is_stock)
+                            break
+                        # 거래량 부족한 경우
+                        else:
+                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                               sell_price=price,
+                                               sell_quantity=volumes, is_stock=is_stock)
+                            quantity -= volumes
+                    if quantity != 0:
+                        balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                           sell_price=price,
+                                           sell_quantity=quantity, is_stock=is_stock)
+
+        # 현재가 업데이트
+        current_price_list = []
+        stock_list = balance.get_all_stock_list()
+        for stock in stock_list:
+            prev_price = stock['현재가']
+            price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+            # 거래 없는 경우
+            if price == 0 or volumes == 0:
+                current_price_list.append(prev_price)
+            else:
+                current_price_list.append(price)
+        balance.update_current_price(current_price_list)
+
+    """
+    보유일 만기 매도 가격 기준 option = '당일 종가'
+    """
+    if use_maturity and sell_param_list_after_maturity[0] == '당일 종가':
+        stock_list = balance.get_all_stock_list()
+        for stock in stock_list:
+            if stock['보유일수'] >= maturity - 1:
+                quantity = stock['수량']
+                # 최대 5분간 매도
+                for time_idx in range(len(timestamp)-fill_bars-1, len(timestamp)):
+                    price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+                    # 거래 없는 경우
+                    if price == 0 or volumes == 0:
+                        continue
+                    # 거래량 충분한 경우:
+                    if volumes >= quantity:
+                        balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                           sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+                        break
+                    # 거래량 부족한 경우:
+                    else:
+                        balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                           sell_price=price, sell_quantity=volumes, is_stock=is_stock)
+                        quantity -= volumes
+                if quantity != 0:
+                    balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
+                                       sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+
+    """
+    Outputs
+    day_stock_list: 거래 종료 후 보유 종목 리스트
+    day_sold_stock_list: 매매일 실현 종목 리스트
+    day_transaction_history: 매매일 거래 내역
+    asset_change, _yield, asset: 총 자산 변동(주식 변동 + 실현 수익), 당일 수익률(주식 변동 + 실현 수익, 백분율), 총 자산
+    거래 종료
+    """
+    day_stock_list = balance.get_all_stock_list()
+    day_sold_stock_list = balance.get_sold_stock_list()
+    day_transaction_history = balance.get_transaction_history()
+    asset_change, _yield, asset = balance.close_transaction()
+
+    return day_stock_list, day_sold_stock_list, day_transaction_history, asset_change, _yield, asset
+
+
+
+
+def _run_simulation(params, transaction):
+    """
+    :return:
+    [(일자, 거래 내역, 총 자산)], result_params
+    """
+    day_list = []
+
+    def recorded_transaction(date, candidate_code_list, balance, **transaction_params):
+        outputs = transaction(date, candidate_code_list, balance, **transaction_params)
+        day_list.append((date, copy.deepcopy(outputs[2]), outputs[5]))
+        return outputs
+
+    original_transaction = simulation._transaction
+    simulation._transaction = recorded_transaction
+    try:
+        result_params = simulation.simulation(**params)
+    finally:
+        simulation._transaction = original_transaction
+    return day_list, result_params
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'max_stock_num': 2},
+    {'손절가': [True, '-2%'], '종목 최소 보유일': [True, 1]},
+    {'종목 최대 보유일': [False, 3]},
+    {'종목 최대 보유일': [False, 3], '재 매수 허용': True, '목표가': '10%'},
+    {'보유일 만기 매도 가격 기준': ['익일 시가']},
+    {'보유일 만기 매도 가격 기준': ['당일 종가']},
+    {'매수 가격 기준': ['변동성 돌파', 0.4], '조건 부합 시 매도 가격 기준': ['지정가', '피벗 1차저항선', '0%']},
+    {'분봉 단위': 5},
+    {'장중 지표 조건': [True, {'매수': '가격 >= VWAP', '매도': '가격 < MA20', '이동평균': [5, 20], '시가 범위': 30}]},
+])
+def test_event_engine_matches_per_minute_loop(synthetic_params, overrides):
+    params = dict(synthetic_params, **overrides)
+    expected_days, expected_result = _run_simulation(params, _per_minute_transaction)
+    days, result = _run_simulation(params, _transaction)
+    assert sum(len(history) for _, history, _ in expected_days) > 0
+    assert [date for date, _, _ in days] == [date for date, _, _ in expected_days]
+    for (date, history, asset), (_, expected_history, expected_asset) in zip(days, expected_days):
+        assert history == expected_history, date
+        assert asset == expected_asset, date
+    assert result['asset_list'] == expected_result['asset_list']
@@ -0,0 +1,52 @@
+"""
+test_volume_leaders.py
+"""
+import numpy as np
+import pandas as pd
+from daily_panel import _DailyPanel
+from data_provider import provider
+from volume_leaders import compute_volume_leaders
+
+
+def _get_leaders_full_sort(daily_panel, date, n):
+    """
+    전체 종목 정렬 기준 구현 (거래량 내림차순, 동일 거래량은 종목 코드 순서, NaN 제외)
+    """
+    volume = daily_panel.data[daily_panel.date_idx[date], :, daily_panel.column_idx['거래량']]
+    order = sorted(np.flatnonzero(~np.isnan(volume)), key=lambda c: (-volume[c], c))
+    return [daily_panel.codes[c] for c in order[:n]]
+
+
+def test_volume_leaders_match_full_sort(synthetic_panel):
+    volume_leaders = compute_volume_leaders(synthetic_panel, top_n=20)
+    for date in synthetic_panel.dates:
+        for n in (1, 10, 20):
+            assert volume_leaders.get_leaders(date, n) == _get_leaders_full_sort(synthetic_panel, date, n), (date, n)
+
+
+def test_volume_leaders_boundary_ties():
+    # 상위 3위 경계에 동일 거래량 종목이 있는 경우 종목 코드 순서
+    codes = ['000010', '000020', '000030', '000040', '000050', '000060']
+    data = np.full((1, len(codes), len(_DailyPanel.COLUMNS)), 1.0)
+    data[0, :, _DailyPanel.COLUMNS.index('거래량')] = [5, 7, 5, np.nan, 9, 5]
+    daily_panel = _DailyPanel(['20210601'], codes, data)
+    volume_leaders = compute_volume_leaders(daily_panel, top_n=3)
+    assert volume_leaders.get_leaders('20210601', 3) == ['000050', '000020', '000010']
+    assert volume_leaders.get_leaders('20210601', 3) == _get_leaders_full_sort(daily_panel, '20210601', 3)
+    assert volume_leaders.get_leader_codes(3) == ['000010', '000020', '000050']
+
+
+def test_volume_leaders_match_snapshot_sort(synthetic_panel):
+    volume_leaders = compute_volume_leaders(synthetic_panel, top_n=20)
+    num_compared = 0
+    for date in synthetic_panel.dates:
+        # 기존 방식: 시장 스냅샷 조회 후 거래량 정렬
+        all_df = pd.concat([provider.get_market_ohlcv_by_ticker(date, market='KOSPI'),
+                            provider.get_market_ohlcv_by_ticker(date, market='KOSDAQ')])
+        volume = all_df['거래량'].sort_values(ascending=False)
+        # 20위 경계에 동일 거래량 종목이 있는 경우 정렬 방식에 따라 포함 종목이 달라짐 -> 비교 제외
+        if len(volume) > 20 and volume.iloc[19] == volume.iloc[20]:
+            continue
+        assert set(volume_leaders.get_leaders(date, 20)) == set(volume.index[:20]), date
+        num_compared += 1
+    assert num_compared > 0
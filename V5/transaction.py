@@ -1,122 +1,189 @@
 """
 transaction.py
 """
-from pykrx import stock
-import json
-from datetime import datetime, timedelta
-import pandas as pd
+import numpy as np
+import heapq
 import os
+from minute_store import get_bar_timestamp, has_minute_partition, load_minute_partition, read_minute_grid, \
+    resample_minute_row
+from intraday_indicators import compute_intraday_indicators
 
-
-def _load_minute_series(candidate_basket, date, data_dir):
-    """
-    :param code_list: 종목 리스트
-    :param date: 일자
-    :return:
-    timestamp
-    minute_data
-    [[(종목1, 가격1, volume1), (종목2, 가격2, volume2), ...],
-     [(종목1, 가격1, volume1), (종목2, 가격2, volume2), ...],
-                                                     ...]
-    """
-    timestamp = ['0901', '0902', '0903', '0904', '0905', '0906', '0907', '0908', '0909', '0910', '0911', '0912', '0913', '0914', '0915', '0916', '0917', '0918', '0919', '0920', '0921', '0922', '0923', '0924', '0925', '0926', '0927', '0928', '0929', '0930', '0931', '0932', '0933', '0934', '0935', '0936', '0937', '0938', '0939', '0940', '0941', '0942', '0943', '0944', '0945', '0946', '0947', '0948', '0949', '0950', '0951', '0952', '0953', '0954', '0955', '0956', '0957', '0958', '0959', '1000', '1001', '1002', '1003', '1004', '1005', '1006', '1007', '1008', '1009', '1010', '1011', '1012', '1013', '1014', '1015', '1016', '1017', '1018', '1019', '1020', '1021', '1022', '1023', '1024', '1025', '1026', '1027', '1028', '1029', '1030', '1031', '1032', '1033', '1034', '1035', '1036', '1037', '1038', '1039', '1040', '1041', '1042', '1043', '1044', '1045', '1046', '1047', '1048', '1049', '1050', '1051', '1052', '1053', '1054', '1055', '1056', '1057', '1058', '1059', '1100', '1101', '1102', '1103', '1104', '1105', '1106', '1107', '1108', '1109', '1110', '1111', '1112', '1113', '1114', '1115', '1116', '1117', '1118', '1119', '1120', '1121', '1122', '1123', '1124', '1125', '1126', '1127', '1128', '1129', '1130', '1131', '1132', '1133', '1134', '1135', '1136', '1137', '1138', '1139', '1140', '1141', '1142', '1143', '1144', '1145', '1146', '1147', '1148', '1149', '1150', '1151', '1152', '1153', '1154', '1155', '1156', '1157', '1158', '1159', '1200', '1201', '1202', '1203', '1204', '1205', '1206', '1207', '1208', '1209', '1210', '1211', '1212', '1213', '1214', '1215', '1216', '1217', '1218', '1219', '1220', '1221', '1222', '1223', '1224', '1225', '1226', '1227', '1228', '1229', '1230', '1231', '1232', '1233', '1234', '1235', '1236', '1237', '1238', '1239', '1240', '1241', '1242', '1243', '1244', '1245', '1246', '1247', '1248', '1249', '1250', '1251', '1252', '1253', '1254', '1255', '1256', '1257', '1258', '1259', '1300', '1301', '1302', '1303', '1304', '1305', '1306', '1307', '1308', '1309', '1310', '1311', '1312', '1313', '1314', '1315', '1316', '1317', '1318', '1319', '1320', '1321', '1322', '1323', '1324', '1325', '1326', '1327', '1328', '1329', '1330', '1331', '1332', '1333', '1334', '1335', '1336', '1337', '1338', '1339', '1340', '1341', '1342', '1343', '1344', '1345', '1346', '1347', '1348', '1349', '1350', '1351', '1352', '1353', '1354', '1355', '1356', '1357', '1358', '1359', '1400', '1401', '1402', '1403', '1404', '1405', '1406', '1407', '1408', '1409', '1410', '1411', '1412', '1413', '1414', '1415', '1416', '1417', '1418', '1419', '1420', '1421', '1422', '1423', '1424', '1425', '1426', '1427', '1428', '1429', '1430', '1431', '1432', '1433', '1434', '1435', '1436', '1437', '1438', '1439', '1440', '1441', '1442', '1443', '1444', '1445', '1446', '1447', '1448', '1449', '1450', '1451', '1452', '1453', '1454', '1455', '1456', '1457', '1458', '1459', '1500', '1501', '1502', '1503', '1504', '1505', '1506', '1507', '1508', '1509', '1510', '1511', '1512', '1513', '1514', '1515', '1516', '1517', '1518', '1519', '1520', '1530']
-    minute_data = [[] for _ in range(len(timestamp))]
-
-    base_dir = data_dir
-    df_list = []
-    for code in candidate_basket:
-        A_code = 'A' + code
-        code_dir = base_dir + A_code + '/'
-        file_list = os.listdir(code_dir)
-        date_list = [date[:-5] for date in file_list]
-        if date not in date_list:
-            df = pd.DataFrame()
+"""
+FILL_MINUTES: 매수 / 매도 최대 체결 구간 (분)
+* N분봉 사용 시 ceil(FILL_MINUTES / N)개 bar로 환산 (e.g. 5분봉: 1 bar) -> 분봉 단위와 무관하게 같은 시간 구간
+"""
+FILL_MINUTES = 5
+
+
+class _MinuteSeries:
+    """
+    매매일 분 단위 데이터
+    code_idx: {종목1: 0, 종목2: 1, ...}
+    price_matrix, volume_matrix: 종목 수 x len(timestamp) 가격, 거래량 (거래 없는 시각은 0)
+    high_matrix, low_matrix: N분봉 사용 시 bar 고가, 저가 (price_matrix는 bar 종가)
+    * 각 종목 row는 처음 조회될 때 load (lazy) -> 조회되지 않은 후보 종목은 읽지 않음
+    """
+    def __init__(self, candidate_basket, date, data_dir, store_dir=None, availability=None, adjustment_factors=None,
+                 bar_size=1):
+        """
+        :param candidate_basket: 종목 리스트
+        :param date: 일자
+        :param data_dir: 분 단위 데이터 경로 (A{code}/{date}.json)
+        :param store_dir: convert_minute_tree 변환 경로 (None 또는 해당 일자 미 변환 시 json 사용)
+        :param availability: data_dir의 _AvailabilityIndex (None: 파일 존재 여부 직접 확인)
+        :param adjustment_factors: _AdjustmentFactors (무수정 데이터를 수정 가격으로 변환, None: 변환 없음)
+        :param bar_size: N분봉 (1: 원본 분 단위, e.g. 5: 5분봉 OHLC + 거래량 합)
+        * matrix 열은 bar 단위 -> 분 단위 구간은 bar 수로 환산하여 사용 (FILL_MINUTES 참고)
+        """
+        self.timestamp = get_bar_timestamp(bar_size)
+        self.bar_size = bar_size
+        self.date = date
+        self.data_dir = data_dir
+        self.availability = availability
+        self.adjustment_factors = adjustment_factors
+        self.code_idx = {}
+        for code in candidate_basket:
+            if code not in self.code_idx:
+                self.code_idx[code] = len(self.code_idx)
+
+        self.store_code_idx = None
+        price_dtype = np.int64
+        if store_dir is not None and has_minute_partition(store_dir, date):
+            self.store_code_idx, self.store_price, self.store_volume = load_minute_partition(store_dir, date)
+            if self.store_price.dtype.kind == 'f':
+                price_dtype = np.float64
+        self.price_matrix = np.zeros((len(self.code_idx), len(self.timestamp)), dtype=price_dtype)
+        self.volume_matrix = np.zeros((len(self.code_idx), len(self.timestamp)), dtype=np.int64)
+        if bar_size > 1:
+            self.high_matrix = np.zeros((len(self.code_idx), len(self.timestamp)), dtype=price_dtype)
+            self.low_matrix = np.zeros((len(self.code_idx), len(self.timestamp)), dtype=price_dtype)
+        self.loaded = np.zeros(len(self.code_idx), dtype=bool)
+
+    def _to_float(self, price_dtype, volume_dtype):
+        if price_dtype.kind == 'f' and self.price_matrix.dtype.kind != 'f':
+            self.price_matrix = self.price_matrix.astype(np.float64)
+            if self.bar_size > 1:
+                self.high_matrix = self.high_matrix.astype(np.float64)
+                self.low_matrix = self.low_matrix.astype(np.float64)
+        if volume_dtype.kind == 'f' and self.volume_matrix.dtype.kind != 'f':
+            self.volume_matrix = self.volume_matrix.astype(np.float64)
+
+    def _load_row(self, code, row):
+        price = None
+        if self.store_code_idx is not None:
+            if code in self.store_code_idx:
+                price = self.store_price[self.store_code_idx[code]]
+                volume = self.store_volume[self.store_code_idx[code]]
         else:
-            file_name = code_dir + date + '.json'
-            df = pd.read_json(file_name, orient='table')
-        df_list.append(df)
-
-    for i, df in enumerate(df_list):
-        code = candidate_basket[i]
-        for j in range(len(df)):
-            if df.iloc[j]['time'] in timestamp:
-                time_idx = timestamp.index(df.iloc[j]['time'])
-                minute_data[time_idx].append((code, df.iloc[j]['price'], df.iloc[j]['volumes']))
-
-    return timestamp, minute_data
-
-
-def exclude_suspended_stocks(date, code_list):
+            file_name = self.data_dir + 'A' + code + '/' + self.date + '.json'
+            has_data = self.availability.has(code, self.date) if self.availability is not None \
+                else os.path.isfile(file_name)
+            if has_data:
+                price, volume = read_minute_grid(file_name)
+        if price is not None:
+            if self.adjustment_factors is not None:
+                price, volume = self.adjustment_factors.adjust_minute_row(code, self.date, price, volume)
+            self._to_float(price.dtype, volume.dtype)
+            if self.bar_size > 1:
+                self.high_matrix[row], self.low_matrix[row], price, volume = \
+                    resample_minute_row(price, volume, self.bar_size)
+            self.price_matrix[row] = price
+            self.volume_matrix[row] = volume
+        self.loaded[row] = True
+
+    def get_row(self, code):
+        """
+        :return:
+        해당 종목 row (최초 조회 시 load, 종목 리스트에 없는 경우 None)
+        """
+        row = self.code_idx.get(code)
+        if row is not None and not self.loaded[row]:
+            self._load_row(code, row)
+        return row
+
+    def take_loaded_rows(self, minute_series):
+        """
+        :param minute_series: 동일 일자, 동일 bar_size _MinuteSeries (e.g. simulation prefetch 단계에서 load)
+        :return:
+        minute_series에서 이미 load된 row 중 종목 리스트에 포함된 row를 가져옴 (파일 재 조회 방지)
+        """
+        for code, row in self.code_idx.items():
+            src_row = minute_series.code_idx.get(code)
+            if src_row is None or not minute_series.loaded[src_row] or self.loaded[row]:
+                continue
+            self._to_float(minute_series.price_matrix.dtype, minute_series.volume_matrix.dtype)
+            if self.bar_size > 1:
+                self.high_matrix[row] = minute_series.high_matrix[src_row]
+                self.low_matrix[row] = minute_series.low_matrix[src_row]
+            self.price_matrix[row] = minute_series.price_matrix[src_row]
+            self.volume_matrix[row] = minute_series.volume_matrix[src_row]
+            self.loaded[row] = True
+        return self
+
+    def load_rows(self, code_list):
+        for code in code_list:
+            self.get_row(code)
+        return self
+
+    def load_all(self):
+        for code, row in self.code_idx.items():
+            if not self.loaded[row]:
+                self._load_row(code, row)
+        return self
+
+
+def exclude_suspended_stocks(date, code_list, daily_panel):
     """
     :param date: 매매 일자
     :param code_list: 종목 리스트
+    :param daily_panel: _DailyPanel
     :return:
     매매 일자 및 전일 거래 정지 종목을 제외한 리스트를 반환
+    * daily panel의 거래 정지 bitmap에서 후보 종목 mask 산출 (panel에 없는 종목, 첫 거래일은 제외)
     """
-    ref_date = datetime.strftime(datetime.strptime(date, "%Y%m%d") - timedelta(days=10), "%Y%m%d")
-    new_code_list = []
-    for code in code_list:
-        while True:
-            try:
-                temp = stock.get_market_ohlcv_by_date(ref_date, date, code)
-                break
-            except:
-                pass
-        if temp.iloc[-1]['시가'] != 0 and temp.iloc[-2]['시가'] != 0:
-            new_code_list.append(code)
-    return new_code_list
+    d = daily_panel.date_idx[date]
+    if d == 0:
+        return []
+    suspended = daily_panel.get_suspension_bitmap()
+    rows = np.array([daily_panel.code_idx.get(code, -1) for code in code_list], dtype=np.int64)
+    valid_rows = np.where(rows >= 0, rows, 0)
+    tradable = (rows >= 0) & ~suspended[d, valid_rows] & ~suspended[d - 1, valid_rows]
+    return [code for code, is_tradable in zip(code_list, tradable) if is_tradable]
 
 
-def get_target_purchase_price(date, code, purchase_param_list):
+def get_target_purchase_price(date, code, purchase_param_list, daily_panel):
     """
     :param date: 매매 일자
     :param code: 종목 코드
     :param purchase_param_list: transaction_params['매수 가격 기준']
+    :param daily_panel: _DailyPanel
     :return:
     해당 종목의 매수 가격 조건
     """
     if purchase_param_list[0] == '지정가':
         if purchase_param_list[1] == '전일 종가':
-            ref_date = datetime.strftime(datetime.strptime(date, "%Y%m%d") - timedelta(days=10), "%Y%m%d")
-            while True:
-                try:
-                    temp = stock.get_market_ohlcv_by_date(ref_date, date, code)
-                    break
-                except:
-                    pass
-            yesterday_close = temp.iloc[-2]['종가']
+            yesterday_close = daily_panel.get_value(code, date, '종가', offset=-1)
             target_purchase_price = yesterday_close * (1 + float(purchase_param_list[2][:-1])/100)
     elif purchase_param_list[0] == '변동성 돌파':
         K = purchase_param_list[1]
-        ref_date = datetime.strftime(datetime.strptime(date, "%Y%m%d") - timedelta(days=10), "%Y%m%d")
-        while True:
-            try:
-                temp = stock.get_market_ohlcv_by_date(ref_date, date, code)
-                break
-            except:
-                pass
-        target_purchase_price = temp.iloc[-1]['시가'] + K * (temp.iloc[-2]['고가'] - temp.iloc[-2]['저가'])
+        today_open = daily_panel.get_value(code, date, '시가')
+        yesterday_high = daily_panel.get_value(code, date, '고가', offset=-1)
+        yesterday_low = daily_panel.get_value(code, date, '저가', offset=-1)
+        target_purchase_price = today_open + K * (yesterday_high - yesterday_low)
     return target_purchase_price
 
 
-def get_pivot_values(date, code):
+def get_pivot_values(date, code, daily_panel):
     """
     :param code: 종목 코드 (e.g. "005930")
     :param date: 일자 (e.g. ('20210708')
+    :param daily_panel: _DailyPanel
     :return:
     2차 저항선, 1차 저항선, 피봇, 1차 지지선, 2차 지지선
     """
-    ref_date = datetime.strftime(datetime.strptime(date, "%Y%m%d") - timedelta(days=10), "%Y%m%d")
-    while True:
-        try:
-            df = stock.get_market_ohlcv_by_date(ref_date, date, code)
-            break
-        except:
-            pass
-    open = df.iloc[-2]['시가']
-    high = df.iloc[-2]['고가']
-    low = df.iloc[-2]['저가']
-    close = df.iloc[-2]['종가']
+    high = daily_panel.get_value(code, date, '고가', offset=-1)
+    low = daily_panel.get_value(code, date, '저가', offset=-1)
+    close = daily_panel.get_value(code, date, '종가', offset=-1)
     pivot = (high + low + close) / 3
     second_resistance = pivot + high - low
     first_resistance = 2 * pivot - low
@@ -125,76 +192,191 @@ def get_pivot_values(date, code):
     return second_resistance, first_resistance, pivot, first_support, second_support
 
 
-def get_target_sell_price(date, code, sell_param_list):
+def get_target_sell_price(date, code, sell_param_list, daily_panel):
     """
     :param date: 매매 일자
     :param code: 종목 코드
     :param sell_param_list: transaction_params['조건 부합 시 매도 가격 기준'/'보유일 만기 매도 가격 기준']
+    :param daily_panel: _DailyPanel
     :return:
     해당 종목의 매도 가격 조건
     """
     if sell_param_list[0] == '지정가':
         if sell_param_list[1] == '전일 종가':
-            ref_date = datetime.strftime(datetime.strptime(date, "%Y%m%d") - timedelta(days=10), "%Y%m%d")
-            while True:
-                try:
-                    temp = stock.get_market_ohlcv_by_date(ref_date, date, code)
-                    break
-                except:
-                    pass
-            yesterday_close = temp.iloc[-2]['종가']
+            yesterday_close = daily_panel.get_value(code, date, '종가', offset=-1)
             target_sell_price = yesterday_close * (1 + float(sell_param_list[2][:-1])/100)
         elif sell_param_list[1] == '피벗 기준선':
-            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code)
+            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code, daily_panel)
             target_sell_price = pivot * (1 + float(sell_param_list[2][:-1])/100)
-        elif sell_param_list[2] == '피벗 1차지지선':
-            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code)
+        elif sell_param_list[1] == '피벗 1차지지선':
+            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code, daily_panel)
             target_sell_price = first_support * (1 + float(sell_param_list[2][:-1])/100)
-        elif sell_param_list[2] == '피벗 2차지지선':
-            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code)
+        elif sell_param_list[1] == '피벗 2차지지선':
+            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code, daily_panel)
             target_sell_price = second_support * (1 + float(sell_param_list[2][:-1])/100)
-        elif sell_param_list[2] == '피벗 1차저항선':
-            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code)
+        elif sell_param_list[1] == '피벗 1차저항선':
+            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code, daily_panel)
             target_sell_price = first_resistance * (1 + float(sell_param_list[2][:-1])/100)
-        elif sell_param_list[2] == '피벗 2차저항선':
-            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code)
+        elif sell_param_list[1] == '피벗 2차저항선':
+            second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code, daily_panel)
             target_sell_price = second_resistance * (1 + float(sell_param_list[2][:-1])/100)
     return target_sell_price
 
 
-def exclude_no_data_stocks(code_list):
+def get_price_levels(date, code_list, daily_panel, purchase_param_list, sell_param_list, sell_param_list_after_maturity):
+    """
+    :param date: 매매 일자
+    :param code_list: 종목 코드 리스트 (후보 종목 + 보유 종목)
+    :param daily_panel: _DailyPanel
+    :param purchase_param_list: transaction_params['매수 가격 기준']
+    :param sell_param_list: transaction_params['조건 부합 시 매도 가격 기준']
+    :param sell_param_list_after_maturity: transaction_params['보유일 만기 매도 가격 기준']
+    :return:
+    price_levels: 매매일 종목별 가격 기준 (분 단위 매매 이전 1회 계산)
+    {
+        code: {
+            '매수 가격': price,
+            '조건 부합 시 매도 가격': price,
+            '보유일 만기 매도 가격': price (지정가가 아닌 경우 None),
+            '피벗 2차저항선': price,
+            '피벗 1차저항선': price,
+            '피벗 기준선': price,
+            '피벗 1차지지선': price,
+            '피벗 2차지지선': price,
+        }
+    }
+    """
+    price_levels = {}
+    for code in code_list:
+        second_resistance, first_resistance, pivot, first_support, second_support = get_pivot_values(date, code, daily_panel)
+        price_levels[code] = {
+            '매수 가격': get_target_purchase_price(date, code, purchase_param_list, daily_panel),
+            '조건 부합 시 매도 가격': get_target_sell_price(date, code, sell_param_list, daily_panel),
+            '보유일 만기 매도 가격': get_target_sell_price(date, code, sell_param_list_after_maturity, daily_panel)
+            if sell_param_list_after_maturity[0] == '지정가' else None,
+            '피벗 2차저항선': second_resistance,
+            '피벗 1차저항선': first_resistance,
+            '피벗 기준선': pivot,
+            '피벗 1차지지선': first_support,
+            '피벗 2차지지선': second_support,
+        }
+    return price_levels
+
+
+def get_win_lose_price(bought_price, target_rate, lose_rate):
+    """
+    :param bought_price: 매입가
+    :param target_rate: 1 + 목표 수익률 (e.g. 1.045)
+    :param lose_rate: 1 + 손절 수익률 (e.g. 0.9), 손절가 미사용 시 0
+    :return:
+    목표가, 손절가
+    """
+    return bought_price * target_rate, bought_price * lose_rate
+
+
+def exclude_no_data_stocks(code_list, available_code_set):
     """
     :param code_list: 종목 코드 리스트
+    :param available_code_set: 데이터 보유 종목 코드 set (krx_codes.json + ETF_codes.json)
     :return:
     데이터 미 보유 제외 종목 코드 리스트
     """
-    with open('krx_codes.json', 'r') as f:
-        stock_code_list = json.load(f)
-    with open('ETF_codes.json', 'r') as f:
-        etf_code_list = json.load(f)
-    all_code_list = stock_code_list + etf_code_list
     new_code_list = []
     for code in code_list:
-        if code in all_code_list:
+        if code in available_code_set:
             new_code_list.append(code)
     return new_code_list
 
 
-def get_price_volumes(minute_data, time_idx, code):
+def get_price_volumes(minute_series, time_idx, code):
     """
-    :param minute_data: minute_data
+    :param minute_series: _MinuteSeries
     :param time_idx: idx
     :param code: 종목 코드
     :return:
     해당 종목의 해당 시간대 가격 및 거래량
     * 없는 경우: 0, 0
     """
-    for item in minute_data[time_idx]:
-        if item[0] == code:
-            price = item[1]
-            volumes = item[2]
-            return price, volumes
-    return 0, 0
+    row = minute_series.get_row(code)
+    if row is None:
+        return 0, 0
+    return minute_series.price_matrix[row, time_idx], minute_series.volume_matrix[row, time_idx]
+
+
+def get_exit_time_idx(minute_series, code, from_idx, win_price, lose_price, target_sell_price=None,
+                      intraday_sell_mask=None):
+    """
+    :param minute_series: _MinuteSeries
+    :param code: 종목 코드
+    :param from_idx: 확인 시작 idx
+    :param win_price: 목표가
+    :param lose_price: 손절가
+    :param target_sell_price: 매도 가격 (None: 미 사용)
+    :param intraday_sell_mask: 장중 매도 조건 mask (None: 미 사용)
+    :return:
+    from_idx 이후 처음으로 매도 조건을 만족하는 idx (없는 경우 None)
+    * 거래 있는 시각 중 {고가 >= 목표가, 저가 <= 손절가, 고가 >= 매도 가격, 장중 매도 조건} 중 하나 이상 만족
+    """
+    row = minute_series.get_row(code)
+    if row is None:
+        return None
+    price = minute_series.price_matrix[row, from_idx:]
+    volume = minute_series.volume_matrix[row, from_idx:]
+    if minute_series.bar_size == 1:
+        low = high = price
+    else:
+        low = minute_series.low_matrix[row, from_idx:]
+        high = minute_series.high_matrix[row, from_idx:]
+    hit = (high >= win_price) | (low <= lose_price)
+    if target_sell_price is not None:
+        hit |= high >= target_sell_price
+    if intraday_sell_mask is not None:
+        hit |= intraday_sell_mask[row, from_idx:]
+    hit &= (price != 0) & (volume != 0)
+    if not hit.any():
+        return None
+    return from_idx + int(np.argmax(hit))
+
+
+def get_entry_time_idx_array(minute_series, code, target_purchase_price, target_sell_price, break_even_price,
+                             intraday_buy_mask=None):
+    """
+    :param minute_series: _MinuteSeries
+    :param code: 종목 코드
+    :param target_purchase_price: 매수 가격
+    :param target_sell_price: 조건 부합 시 매도 가격
+    :param break_even_price: 손익 분기 매수 가격
+    :param intraday_buy_mask: 장중 매수 조건 mask (None: 미 사용)
+    :return:
+    매수 조건을 만족하는 idx array (오름차순)
+    * 거래 있는 시각 중 {저가 <= 매수 가격, 저가 < 매도 가격, 저가 <= 손익 분기 가격, 장중 매수 조건} 모두 만족
+    """
+    row = minute_series.get_row(code)
+    if row is None:
+        return np.array([], dtype=np.int64)
+    price = minute_series.price_matrix[row]
+    volume = minute_series.volume_matrix[row]
+    low = price if minute_series.bar_size == 1 else minute_series.low_matrix[row]
+    hit = (price != 0) & (volume != 0) & (low <= target_purchase_price) & ~(low >= target_sell_price) & \
+        (low <= break_even_price)
+    if intraday_buy_mask is not None:
+        hit &= intraday_buy_mask[row]
+    return np.flatnonzero(hit)
+
+
+def get_last_price(minute_series, code, from_idx, default_price):
+    """
+    :return:
+    from_idx 이후 마지막 거래 가격 (없는 경우 default_price)
+    """
+    row = minute_series.get_row(code)
+    if row is None:
+        return default_price
+    traded = np.flatnonzero((minute_series.price_matrix[row, from_idx:] != 0) &
+                            (minute_series.volume_matrix[row, from_idx:] != 0))
+    if len(traded) == 0:
+        return default_price
+    return minute_series.price_matrix[row, from_idx + traded[-1]]
 
 
 def _transaction(date, candidate_code_list, balance, **transaction_params):
@@ -218,6 +400,13 @@ def _transaction(date, candidate_code_list, balance, **transaction_params):
     'buy_flag': True,
     'sell_flag': False,
     'is_stock': True,
+    'daily_panel': _DailyPanel,
+    'available_code_set': set(데이터 보유 종목 코드),
+    'availability': _AvailabilityIndex,
+    'adjustment_factors': _AdjustmentFactors,
+    '분봉 단위': 1,
+    '장중 지표 조건': [False, {'매수': '가격 >= VWAP', '매도': None, '이동평균': [5, 20], '시가 범위': 30}],
+    'minute_series': _MinuteSeries (prefetch 사용 시 매매일 분 데이터, None: 직접 load),
     }
     :return: 
     매매 알고리즘 실행 후 하기 값 반환
@@ -246,19 +435,28 @@ def _transaction(date, candidate_code_list, balance, **transaction_params):
     buy_flag = transaction_params['buy_flag']
     sell_all_flag = transaction_params['sell_all_flag']
     is_stock = transaction_params['is_stock']
+    daily_panel = transaction_params['daily_panel']
+    available_code_set = transaction_params['available_code_set']
+    availability = transaction_params.get('availability')
+    adjustment_factors = transaction_params.get('adjustment_factors')
+    bar_size = transaction_params.get('분봉 단위', 1)
+    use_intraday_condition, intraday_condition = transaction_params.get('장중 지표 조건', [False, {}])
 
     data_dir = stock_data_dir if is_stock else ETF_data_dir
+    store_dir = transaction_params.get('stock_store_dir') if is_stock else transaction_params.get('ETF_store_dir')
+    # 최대 체결 구간 bar 수 (원본 분 단위: 5)
+    fill_bars = -(-FILL_MINUTES // bar_size)
 
     """
     데이터 미 보유 종목 제외
     """
-    candidate_code_list = exclude_no_data_stocks(candidate_code_list)
+    candidate_code_list = exclude_no_data_stocks(candidate_code_list, available_code_set)
     
     """
     거래 정지 종목 제외 (전날 or 당일 거래 정지 종목)
     """
-    candidate_code_list = exclude_suspended_stocks(date, candidate_code_list)
-    stock_code_list = exclude_suspended_stocks(date, balance.get_all_stock_code_list())
+    candidate_code_list = exclude_suspended_stocks(date, candidate_code_list, daily_panel)
+    stock_code_list = exclude_suspended_stocks(date, balance.get_all_stock_code_list(), daily_panel)
 
     """
     재 매수 방지 option
@@ -271,13 +469,49 @@ def _transaction(date, candidate_code_list, balance, **transaction_params):
     Load 매매일 분 데이터
     timestamp
     ['0901', '0902', ..., '1520', '1530']
-    minute_data
-    [[(종목1, 가격1, volume1), (종목2, 가격2, volume2), ...],
-     [(종목1, 가격1, volume1), (종목2, 가격2, volume2), ...],
-                                                     ...]
+    minute_series
+    _MinuteSeries (종목 수 x len(timestamp) 가격, 거래량)
+    * 후보 종목 데이터는 매수 루프에서 처음 조회될 때 load
+    * 분봉 단위 N > 1: N분봉(고가 / 저가로 조건 확인, 종가로 체결) 기준 매매 (screening 용 근사)
     """
     candidate_and_stock_code_list = candidate_code_list + stock_code_list
-    timestamp, minute_data = _load_minute_series(candidate_and_stock_code_list, date, data_dir)
+    minute_series = _MinuteSeries(candidate_and_stock_code_list, date, data_dir, store_dir, availability,
+                                  adjustment_factors, bar_size)
+    prefetched_minute_series = transaction_params.get('minute_series')
+    if prefetched_minute_series is not None and prefetched_minute_series.date == date and \
+            prefetched_minute_series.bar_size == bar_size:
+        # simulation prefetch 단계에서 미리 load한 데이터 사용
+        minute_series.take_loaded_rows(prefetched_minute_series)
+    timestamp = minute_series.timestamp
+
+    """
+    매매일 가격 기준 (매수 가격, 매도 가격, 피벗)
+    * 일자 및 종목에만 의존하므로 분 단위 매매 이전 1회 계산
+    position_levels: 보유 종목별 목표가, 손절가 {(코드, 매입날짜): (목표가, 손절가)}
+    """
+    price_levels = get_price_levels(date, candidate_and_stock_code_list, daily_panel, purchase_param_list,
+                                    sell_param_list, sell_param_list_after_maturity)
+    target_rate = 1 + float(target_margin[:-1])/100
+    lose_rate = 1 + float(loss_margin[:-1])/100 if use_stop_loss else 0
+    position_levels = {}
+
+    """
+    장중 지표 조건 (VWAP, 누적 거래량, 분 이동평균, 시가 범위, 당일 수익률)
+    * 사용 시 전체 종목 분 데이터를 load 후 지표를 한 번에 계산하여 매수 / 매도 조건 mask 산출
+    intraday_buy_mask: 매수 조건에 추가 (모두 만족 시 매수)
+    intraday_sell_mask: 조건 부합 시 매도 조건에 추가 (하나라도 만족 시 매도)
+    종목 수 x len(timestamp) bool, None: 미 사용
+    """
+    intraday_buy_mask = None
+    intraday_sell_mask = None
+    if use_intraday_condition:
+        intraday_indicators = compute_intraday_indicators(minute_series.load_all(),
+                                                          ma_windows=intraday_condition.get('이동평균', [5, 20]),
+                                                          opening_range=intraday_condition.get('시가 범위', 30))
+        if intraday_condition.get('매수') is not None:
+            intraday_buy_mask = intraday_indicators.evaluate(intraday_condition['매수'])
+        if intraday_condition.get('매도') is not None:
+            intraday_sell_mask = intraday_indicators.evaluate(intraday_condition['매도'])
 
     """
     청산 Condition
@@ -287,8 +521,8 @@ def _transaction(date, candidate_code_list, balance, **transaction_params):
         for stock in stock_list:
             quantity = stock['수량']
             # 최대 5분간 매도
-            for time_idx in range(5):
-                price, volumes = get_price_volumes(minute_data=minute_data, time_idx=time_idx, code=stock['코드'])
+            for time_idx in range(fill_bars):
+                price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
                 # 거래 없는 경우
                 if price == 0 or volumes == 0:
                     continue
@@ -315,8 +549,8 @@ def _transaction(date, candidate_code_list, balance, **transaction_params):
             if stock['보유일수'] >= maturity:
                 quantity = stock['수량']
                 # 최대 5분간 매도
-                for time_idx in range(5):
-                    price, volumes = get_price_volumes(minute_data=minute_data, time_idx=time_idx, code=stock['코드'])
+                for time_idx in range(fill_bars):
+                    price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
                     # 거래 없는 경우
                     if price == 0 or volumes == 0:
                         continue
@@ -334,255 +568,177 @@ def _transaction(date, candidate_code_list, balance, **transaction_params):
                     balance.sell_stock(sell_date=date, sell_time=timestamp[time_idx], code=stock['코드'],
                                        sell_price=price, sell_quantity=quantity, is_stock=is_stock)
 
+    """
+    매도 event
+    * 목표가, 손절가, 매도 가격은 당일 고정 -> 보유 종목별로 매도 조건을 처음 만족하는 분을 한 번에 계산
+    exit_events: heap [(매도 조건 만족 분 idx, 등록 순서, 보유 종목)]
+    entry_time_idx: {id(보유 종목): 등록 분 idx} (registered_stock_list로 참조 유지 -> id 재 사용 방지)
+    """
+    exit_events = []
+    entry_time_idx = {}
+    entry_order = {}
+    registered_stock_list = []
+
+    def is_held(stock):
+        return any(held_stock is stock for held_stock in balance.stock_list)
+
+    def schedule_exit(stock, from_idx):
+        if id(stock) not in entry_time_idx:
+            entry_time_idx[id(stock)] = from_idx
+            entry_order[id(stock)] = len(registered_stock_list)
+            registered_stock_list.append(stock)
+        # 최소 보유일
+        if use_min_hold and stock['보유일수'] < min_hold:
+            return
+        if stock['코드'] not in minute_series.code_idx:
+            return
+        # 목표가, 손절가
+        position_key = (stock['코드'], stock['날짜'])
+        if position_key not in position_levels:
+            position_levels[position_key] = get_win_lose_price(stock['매입가'], target_rate, lose_rate)
+        win_price, lose_price = position_levels[position_key]
+        # 만기 이후: 보유일 만기 매도 가격 기준 (지정가인 경우), 만기 이전 또는 만기 옵션 X: 조건 부합 시 매도 가격 기준
+        if use_maturity and stock['보유일수'] >= maturity:
+            target_sell_price = price_levels[stock['코드']]['보유일 만기 매도 가격']
+            sell_mask = None
+        else:
+            target_sell_price = price_levels[stock['코드']]['조건 부합 시 매도 가격']
+            sell_mask = intraday_sell_mask
+        exit_idx = get_exit_time_idx(minute_series, stock['코드'], from_idx, win_price, lose_price, target_sell_price,
+                                     sell_mask)
+        if exit_idx is not None:
+            heapq.heappush(exit_events, (exit_idx, entry_order[id(stock)], stock))
+
+    for stock in balance.get_all_stock_list():
+        schedule_exit(stock, 0)
+
+    """
+    매수 event (entry scheduler)
+    * 매수 가격, 매도 가격, 손익 분기 가격은 당일 고정 -> 후보 종목별로 매수 조건을 만족하는 분 idx를 한 번에 계산
+    buy_events: heap [(매수 조건 만족 분 idx, 우선 순위, 종목 코드)] (우선 순위 = 후보 종목 리스트 순서)
+    waiting_buy_list: 보유 종목 수가 최대인 동안 대기 중인 후보 종목 [(우선 순위, 종목 코드, 확인 시작 분 idx)]
+    * 매도로 보유 종목 수가 줄어든 경우 매도 다음 분부터 다시 등록
+    """
+    buy_events = []
+    waiting_buy_list = []
+    entry_time_idx_arrays = {}
+    if buy_flag:
+        for priority, code in enumerate(candidate_code_list):
+            if code not in candidate_code_list[:priority]:
+                waiting_buy_list.append((priority, code, 0))
+
+    def schedule_buy(priority, code, from_idx):
+        if code not in entry_time_idx_arrays:
+            target_sell_price = price_levels[code]['조건 부합 시 매도 가격']
+            break_even_price = target_sell_price * (1 - fee_rate - tax_rate) / (1 + fee_rate) \
+                if is_stock else target_sell_price * (1 - fee_rate) / (1 + fee_rate)
+            entry_time_idx_arrays[code] = get_entry_time_idx_array(minute_series, code, price_levels[code]['매수 가격'],
+                                                                   target_sell_price, break_even_price,
+                                                                   intraday_buy_mask)
+        time_idx_array = entry_time_idx_arrays[code]
+        k = np.searchsorted(time_idx_array, from_idx)
+        if k < len(time_idx_array):
+            heapq.heappush(buy_events, (int(time_idx_array[k]), priority, code))
+
+    def schedule_waiting_buys(from_idx):
+        for priority, code, waiting_from_idx in waiting_buy_list:
+            schedule_buy(priority, code, max(waiting_from_idx, from_idx))
+        waiting_buy_list.clear()
+
     """
     분 단위 매매 시뮬레이션
+    * 매수 / 매도 event가 있는 분만 처리 (분 순서, 같은 분은 매수 -> 매도 순서)
     """
     today_bought_code_list = []
-    for time_idx in range(len(timestamp)):
-        # 매수
-        if buy_flag and balance.stock_num < balance.max_stock_num:
-            for code in candidate_code_list:
-                if code not in today_bought_code_list:
-                    target_purchase_price = get_target_purchase_price(date=date, code=code,
-                                                                      purchase_param_list=purchase_param_list)
-                    target_sell_price = get_target_sell_price(date, code, sell_param_list)
-                    price, volumes = get_price_volumes(minute_data=minute_data, time_idx=time_idx, code=code)
-                    # 거래 없는 경우
-                    if price == 0 or volumes == 0:
-                        continue
-                    # 매수 조건 만족 시
-                    # {매수 시점 가격 >= 조건 부합 시 매도 가격}인 경우 매수 방지 -> 매수 시점에 매도 조건을 만족하는 모순
-                    # {매수 가격 <= 조건 부합 시 매도 가격 * (1 - fee_rate - tax_rate) / (1 + fee_rate)}인 경우 매수 -> 매도 가격이 손익 분기 넘도록
-                    if price <= target_purchase_price and not price >= target_sell_price:
-                        break_even_price = target_sell_price * (1 - fee_rate - tax_rate) / (1 + fee_rate) \
-                            if is_stock else target_sell_price * (1 - fee_rate) / (1 + fee_rate)
-                        if price <= break_even_price:
-                            quantity = (balance.get_asset() / balance.max_stock_num) // price
-                            # 최대 5분간 매수
-                            bought = False
-                            for p_time_idx in range(time_idx, min(time_idx+5, len(timestamp)-1)):
-                                price, volumes = get_price_volumes(minute_data=minute_data, time_idx=p_time_idx, code=code)
-                                # 거래 없는 경우
-                                if price == 0 or volumes == 0:
-                                    continue
-                                bought = True
-                                # 거래량 충분한 경우
-                                if volumes >= quantity:
-                                    balance.purchase_stock(date=date, time=timestamp[p_time_idx], code=code,
-                                                           price=price, quantity=quantity, is_stock=is_stock)
-                                    break
-                                # 거래량 부족한 경우
-                                else:
-                                    balance.purchase_stock(date=date, time=timestamp[p_time_idx], code=code,
-                                                           price=price, quantity=volumes, is_stock=is_stock)
-                                    quantity -= volumes
-                            # 당일 재매수 금지
-                            if bought:
-                                today_bought_code_list.append(code)
-                if balance.stock_num >= balance.max_stock_num:
-                    break
-
-        # 매도
-        stock_list = balance.get_all_stock_list()
-        for stock in stock_list:
-            # 최소 보유일
-            if use_min_hold:
-                if stock['보유일수'] < min_hold:
+    num_bought = 0
+    if balance.stock_num < balance.max_stock_num:
+        schedule_waiting_buys(0)
+    while buy_events or exit_events:
+        time_idx = min(buy_events[0][0] if buy_events else len(timestamp),
+                       exit_events[0][0] if exit_events else len(timestamp))
+        # 매수 (우선 순위 순서)
+        while buy_events and buy_events[0][0] == time_idx:
+            _, priority, code = heapq.heappop(buy_events)
+            # 최대 보유 종목 수 -> 매도 이후까지 대기
+            if balance.stock_num >= balance.max_stock_num:
+                waiting_buy_list.append((priority, code, time_idx + 1))
+                continue
+            price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=code)
+            quantity = (balance.get_asset() / balance.max_stock_num) // price
+            # 최대 5분간 매수
+            bought = False
+            for p_time_idx in range(time_idx, min(time_idx+fill_bars, len(timestamp)-1)):
+                price, volumes = get_price_volumes(minute_series=minute_series, time_idx=p_time_idx, code=code)
+                # 거래 없는 경우
+                if price == 0 or volumes == 0:
                     continue
-            bought_price = stock['매입가']
-            # 목표가
-            win_price = bought_price * (1 + float(target_margin[:-1])/100)
-            # 손절가
-            lose_price = bought_price * (1 + float(loss_margin[:-1])/100) if use_stop_loss else 0
-            # 만기 옵션 O
-            if use_maturity:
-                # 만기 이전
-                if stock['보유일수'] < maturity:
-                    price, volumes = get_price_volumes(minute_data=minute_data, time_idx=time_idx, code=stock['코드'])
-                    # 거래 없는 경우
-                    if price == 0 or volumes == 0:
-                        continue
-                    # 익절/손절
-                    if price >= win_price or price <= lose_price:
-                        quantity = stock['수량']
-                        # 최대 5분간 매도
-                        for s_time_idx in range(time_idx, min(time_idx+5, len(timestamp)-1)):
-                            price, volumes = get_price_volumes(minute_data=minute_data, time_idx=s_time_idx, code=stock['코드'])
-                            # 거래 없는 경우
-                            if price == 0 or volumes == 0:
-                                continue
-                            # 거래량 충분한 경우
-                            if volumes >= quantity:
-                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                                   sell_price=price, sell_quantity=quantity, is_stock=is_stock)
-                                break
-                            # 거래량 부족한 경우
-                            else:
-                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                                   sell_price=price, sell_quantity=volumes, is_stock=is_stock)
-                                quantity -= volumes
-                        if quantity != 0:
-                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                               sell_price=price, sell_quantity=quantity, is_stock=is_stock)
-                        continue
-
-                    # 조건 부합 시 매도 가격 기준
-                    target_sell_price = get_target_sell_price(date, stock['코드'], sell_param_list)
-                    if price >= target_sell_price:
-                        quantity = stock['수량']
-                        # 최대 5분간 매도
-                        for s_time_idx in range(time_idx, min(time_idx+5, len(timestamp)-1)):
-                            price, volumes = get_price_volumes(minute_data=minute_data, time_idx=s_time_idx, code=stock['코드'])
-                            # 거래 없는 경우
-                            if price == 0 or volumes == 0:
-                                continue
-                            # 거래량 충분한 경우
-                            if volumes >= quantity:
-                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
-                                                   sell_quantity=quantity, is_stock=is_stock)
-                                break
-                            # 거래량 부족한 경우
-                            else:
-                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
-                                                   sell_quantity=volumes, is_stock=is_stock)
-                                quantity -= volumes
-                        if quantity != 0:
-                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
-                                               sell_quantity=quantity, is_stock=is_stock)
-
-                # 만기 이후
+                bought = True
+                # 거래량 충분한 경우
+                if volumes >= quantity:
+                    balance.purchase_stock(date=date, time=timestamp[p_time_idx], code=code,
+                                           price=price, quantity=quantity, is_stock=is_stock)
+                    break
+                # 거래량 부족한 경우
                 else:
-                    price, volumes = get_price_volumes(minute_data=minute_data, time_idx=time_idx, code=stock['코드'])
-                    # 거래 없는 경우
-                    if price == 0 or volumes == 0:
-                        continue
-                    # 익절/손절
-                    if price >= win_price or price <= lose_price:
-                        quantity = stock['수량']
-                        # 최대 5분간 매도
-                        for s_time_idx in range(time_idx, min(time_idx+5, len(timestamp)-1)):
-                            price, volumes = get_price_volumes(minute_data=minute_data, time_idx=s_time_idx, code=stock['코드'])
-                            # 거래 없는 경우
-                            if price == 0 or volumes == 0:
-                                continue
-                            # 거래량 충분한 경우
-                            if volumes >= quantity:
-                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
-                                                   sell_quantity=quantity, is_stock=is_stock)
-                                break
-                            # 거래량 부족한 경우
-                            else:
-                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
-                                                   sell_quantity=volumes, is_stock=is_stock)
-                                quantity -= volumes
-                        if quantity != 0:
-                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'], sell_price=price,
-                                               sell_quantity=quantity, is_stock=is_stock)
-                        continue
-
-                    # 보유일 만기 매도 가격 기준
-                    if sell_param_list_after_maturity[0] == '지정가':
-                        target_sell_price = get_target_sell_price(date, stock['코드'], sell_param_list_after_maturity)
-                        if price >= target_sell_price:
-                            quantity = stock['수량']
-                            # 최대 5분간 매도
-                            for s_time_idx in range(time_idx, min(time_idx + 5, len(timestamp) - 1)):
-                                price, volumes = get_price_volumes(minute_data=minute_data, time_idx=s_time_idx,
-                                                                   code=stock['코드'])
-                                # 거래 없는 경우
-                                if price == 0 or volumes == 0:
-                                    continue
-                                # 거래량 충분한 경우
-                                if volumes >= quantity:
-                                    balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                                       sell_price=price,
-                                                       sell_quantity=quantity, is_stock=is_stock)
-                                    break
-                                # 거래량 부족한 경우
-                                else:
-                                    balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                                       sell_price=price,
-                                                       sell_quantity=volumes, is_stock=is_stock)
-                                    quantity -= volumes
-                            if quantity != 0:
-                                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                                   sell_price=price,
-                                                   sell_quantity=quantity, is_stock=is_stock)
-
-            # 만기 옵션 X
+                    balance.purchase_stock(date=date, time=timestamp[p_time_idx], code=code,
+                                           price=price, quantity=volumes, is_stock=is_stock)
+                    quantity -= volumes
+            # 당일 재매수 금지
+            if bought:
+                today_bought_code_list.append(code)
             else:
-                price, volumes = get_price_volumes(minute_data=minute_data, time_idx=time_idx, code=stock['코드'])
+                schedule_buy(priority, code, time_idx + 1)
+
+        # 매수 종목 매도 event 등록
+        if len(today_bought_code_list) > num_bought:
+            num_bought = len(today_bought_code_list)
+            for stock in balance.get_all_stock_list():
+                if id(stock) not in entry_time_idx:
+                    schedule_exit(stock, time_idx)
+
+        # 매도 (해당 분에 매도 조건을 만족하는 보유 종목만 처리, 보유 종목 리스트 순서)
+        while exit_events and exit_events[0][0] == time_idx:
+            _, _, stock = heapq.heappop(exit_events)
+            if not is_held(stock):
+                continue
+            price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
+            quantity = stock['수량']
+            # 최대 5분간 매도
+            for s_time_idx in range(time_idx, min(time_idx + fill_bars, len(timestamp) - 1)):
+                price, volumes = get_price_volumes(minute_series=minute_series, time_idx=s_time_idx, code=stock['코드'])
                 # 거래 없는 경우
                 if price == 0 or volumes == 0:
                     continue
-                # 익절/손절
-                if price >= win_price or price <= lose_price:
-                    quantity = stock['수량']
-                    # 최대 5분간 매도
-                    for s_time_idx in range(time_idx, min(time_idx + 5, len(timestamp) - 1)):
-                        price, volumes = get_price_volumes(minute_data=minute_data, time_idx=s_time_idx,
-                                                           code=stock['코드'])
-                        # 거래 없는 경우
-                        if price == 0 or volumes == 0:
-                            continue
-                        # 거래량 충분한 경우
-                        if volumes >= quantity:
-                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                               sell_price=price,
-                                               sell_quantity=quantity, is_stock=is_stock)
-                            break
-                        # 거래량 부족한 경우
-                        else:
-                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                               sell_price=price,
-                                               sell_quantity=volumes, is_stock=is_stock)
-                            quantity -= volumes
-                    if quantity != 0:
-                        balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                           sell_price=price,
-                                           sell_quantity=quantity, is_stock=is_stock)
-                    continue
+                # 거래량 충분한 경우
+                if volumes >= quantity:
+                    balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                       sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+                    break
+                # 거래량 부족한 경우
+                else:
+                    balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                       sell_price=price, sell_quantity=volumes, is_stock=is_stock)
+                    quantity -= volumes
+            if quantity != 0:
+                balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
+                                   sell_price=price, sell_quantity=quantity, is_stock=is_stock)
+            # 동일 종목 중복 보유 시 앞선 종목이 매도됨 -> 여전히 보유 중이면 다음 분부터 다시 확인
+            if is_held(stock):
+                schedule_exit(stock, time_idx + 1)
 
-                # 조건 부합 시 매도 가격 기준
-                target_sell_price = get_target_sell_price(date, stock['코드'], sell_param_list)
-                if price >= target_sell_price:
-                    quantity = stock['수량']
-                    # 최대 5분간 매도
-                    for s_time_idx in range(time_idx, min(time_idx + 5, len(timestamp) - 1)):
-                        price, volumes = get_price_volumes(minute_data=minute_data, time_idx=s_time_idx,
-                                                           code=stock['코드'])
-                        # 거래 없는 경우
-                        if price == 0 or volumes == 0:
-                            continue
-                        # 거래량 충분한 경우
-                        if volumes >= quantity:
-                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                               sell_price=price,
-                                               sell_quantity=quantity, is_stock=is_stock)
-                            break
-                        # 거래량 부족한 경우
-                        else:
-                            balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                               sell_price=price,
-                                               sell_quantity=volumes, is_stock=is_stock)
-                            quantity -= volumes
-                    if quantity != 0:
-                        balance.sell_stock(sell_date=date, sell_time=timestamp[s_time_idx], code=stock['코드'],
-                                           sell_price=price,
-                                           sell_quantity=quantity, is_stock=is_stock)
-
-        # 현재가 업데이트
-        current_price_list = []
-        stock_list = balance.get_all_stock_list()
-        for stock in stock_list:
-            prev_price = stock['현재가']
-            price, volumes = get_price_volumes(minute_data=minute_data, time_idx=time_idx, code=stock['코드'])
-            # 거래 없는 경우
-            if price == 0 or volumes == 0:
-                current_price_list.append(prev_price)
-            else:
-                current_price_list.append(price)
-        balance.update_current_price(current_price_list)
+        # 매도로 보유 종목 수가 줄어든 경우 대기 중인 후보 종목 다시 등록
+        if waiting_buy_list and balance.stock_num < balance.max_stock_num:
+            schedule_waiting_buys(time_idx + 1)
+
+    """
+    현재가 업데이트
+    * 보유 종목별 등록 시점 이후 마지막 거래 가격 (거래 없는 경우 기존 현재가)
+    """
+    current_price_list = []
+    for stock in balance.get_all_stock_list():
+        current_price_list.append(get_last_price(minute_series, stock['코드'], entry_time_idx.get(id(stock), 0),
+                                                 stock['현재가']))
+    balance.update_current_price(current_price_list)
 
     """
     보유일 만기 매도 가격 기준 option = '당일 종가'
@@ -593,8 +749,8 @@ def _transaction(date, candidate_code_list, balance, **transaction_params):
             if stock['보유일수'] >= maturity - 1:
                 quantity = stock['수량']
                 # 최대 5분간 매도
-                for time_idx in range(len(timestamp)-6, len(timestamp)):
-                    price, volumes = get_price_volumes(minute_data=minute_data, time_idx=time_idx, code=stock['코드'])
+                for time_idx in range(len(timestamp)-fill_bars-1, len(timestamp)):
+                    price, volumes = get_price_volumes(minute_series=minute_series, time_idx=time_idx, code=stock['코드'])
                     # 거래 없는 경우
                     if price == 0 or volumes == 0:
                         continue
@@ -0,0 +1,124 @@
+"""
+volume_leaders.py
+"""
+import numpy as np
+import os
+from data_provider import provider
+
+"""
+_leaders_memory: keep_in_memory=True로 load한 table {캐시 파일명: _VolumeLeaders}
+"""
+_leaders_memory = {}
+
+
+class _VolumeLeaders:
+    """
+    일자별 거래량 상위 종목 table
+    * leader_idx[d, k]: d일 거래량 k+1위 종목의 codes index (-1: 해당 순위 종목 없음)
+    * volumes[d, k]: 해당 종목 거래량
+    * 동일 거래량은 종목 코드 순서
+    """
+    def __init__(self, dates, codes, leader_idx, volumes):
+        """
+        :param dates: 거래일 리스트
+        :param codes: 종목 코드 리스트 (daily panel codes)
+        :param leader_idx: np.ndarray (len(dates), top_n)
+        :param volumes: np.ndarray (len(dates), top_n)
+        """
+        self.dates = list(dates)
+        self.codes = list(codes)
+        self.leader_idx = leader_idx
+        self.volumes = volumes
+        self.top_n = leader_idx.shape[1]
+        self.date_idx = {date: i for i, date in enumerate(self.dates)}
+
+    def get_leaders(self, date, n=100):
+        """
+        :param date: 기준 일자
+        :param n: 상위 종목 수 (top_n 이하)
+        :return:
+        거래량 상위 n개 종목 코드 리스트 (거래량 내림차순)
+        """
+        if n > self.top_n:
+            raise ValueError('저장된 상위 종목 수(' + str(self.top_n) + ') 초과: ' + str(n))
+        return [self.codes[c] for c in self.leader_idx[self.date_idx[date], :n] if c >= 0]
+
+    def get_leader_codes(self, n=100):
+        """
+        :param n: 상위 종목 수 (top_n 이하)
+        :return:
+        전체 기간 중 한 번 이상 거래량 상위 n개에 포함된 종목 코드 리스트 (후보 / 보유 가능 종목)
+        """
+        if n > self.top_n:
+            raise ValueError('저장된 상위 종목 수(' + str(self.top_n) + ') 초과: ' + str(n))
+        return [self.codes[c] for c in np.unique(self.leader_idx[:, :n]) if c >= 0]
+
+    def save(self, fname):
+        np.savez(fname, dates=np.array(self.dates), codes=np.array(self.codes), leader_idx=self.leader_idx,
+                 volumes=self.volumes)
+
+    @classmethod
+    def load(cls, fname):
+        npz = np.load(fname)
+        return cls(npz['dates'].tolist(), npz['codes'].tolist(), npz['leader_idx'], npz['volumes'])
+
+
+def compute_volume_leaders(daily_panel, top_n=100):
+    """
+    :param daily_panel: _DailyPanel (무수정 거래량)
+    :param top_n: 저장할 상위 종목 수
+    :return:
+    _VolumeLeaders
+    * 일자별 argpartition으로 상위 top_n개만 선택 후 정렬 (전체 정렬 생략)
+    """
+    volume = daily_panel.data[:, :, daily_panel.column_idx['거래량']]
+    leader_idx = np.full((len(daily_panel.dates), top_n), -1, dtype=np.int64)
+    volumes = np.full((len(daily_panel.dates), top_n), np.nan)
+    for d in range(len(daily_panel.dates)):
+        valid = np.flatnonzero(~np.isnan(volume[d]))
+        values = volume[d, valid]
+        if len(valid) > top_n:
+            # top_n번째 거래량 이상인 종목만 남긴 뒤 정렬 (경계 동일 거래량 종목 포함)
+            threshold = -np.partition(-values, top_n - 1)[top_n - 1]
+            selected = values >= threshold
+            valid, values = valid[selected], values[selected]
+        # codes 순서 유지 정렬 -> 동일 거래량은 종목 코드 순서
+        order = np.argsort(-values, kind='stable')[:top_n]
+        leader_idx[d, :len(order)] = valid[order]
+        volumes[d, :len(order)] = values[order]
+    return _VolumeLeaders(daily_panel.dates, daily_panel.codes, leader_idx, volumes)
+
+
+def load_volume_leaders(daily_panel, top_n=100, cache_dir='./cache/', keep_in_memory=False):
+    """
+    :param daily_panel: _DailyPanel (무수정, load_daily_panel 결과)
+    :param top_n: 상위 종목 수
+    :param cache_dir: 캐시 저장 경로 (daily panel 캐시와 동일 경로)
+    :param keep_in_memory: True인 경우 process memory에 유지
+    :return:
+    _VolumeLeaders
+    * 동일 daily panel에 대해 한 번만 계산 후 npz 캐시에서 로드 (top_n이 더 큰 캐시가 있으면 재 사용)
+    * 시장 데이터 source별 경로 사용
+    """
+    cache_dir = provider.get_derived_cache_dir(cache_dir)
+    prefix = 'volume_leaders_' + daily_panel.dates[0] + '_' + daily_panel.dates[-1] + '_' + \
+             str(len(daily_panel.codes)) + '_'
+    fname = os.path.join(cache_dir, prefix + str(top_n) + '.npz')
+    if keep_in_memory and fname in _leaders_memory:
+        return _leaders_memory[fname]
+    if os.path.isdir(cache_dir):
+        for cached in sorted(os.listdir(cache_dir)):
+            if cached.startswith(prefix) and int(cached[len(prefix):-len('.npz')]) >= top_n:
+                volume_leaders = _VolumeLeaders.load(os.path.join(cache_dir, cached))
+                if volume_leaders.codes == daily_panel.codes:
+                    if keep_in_memory:
+                        _leaders_memory[fname] = volume_leaders
+                    return volume_leaders
+
+    volume_leaders = compute_volume_leaders(daily_panel, top_n)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    volume_leaders.save(fname)
+    if keep_in_memory:
+        _leaders_memory[fname] = volume_leaders
+    return volume_leaders